@@ -22,10 +22,15 @@ bl_info = {
     "category" : "Generic"
 }
 
-import bpy
-
-from .dmg_constructor import ImportDMG
-from .dma_importer import ImportDMA
+try:
+    import bpy
+except ImportError:
+    # The parsers are also imported outside of Blender, e.g. by the worker processes that load cells in parallel
+    bpy = None
+
+if bpy is not None:
+    from .dmg_constructor import ImportDMG
+    from .dma_importer import ImportDMA
 
 def menu_dmg_import(self, context):
     self.layout.operator(ImportDMG.bl_idname, text="Trimorph Locale (.dmg)")
@@ -0,0 +1,145 @@
+# Converts every locale, cell and skin file under a directory without Blender.
+# Files are recognised by their headers rather than their extensions and parsed in a pool of worker processes.
+# Each parsed file is written under its relative path in the output directory as a .npz holding its arrays
+# plus a JSON metadata record, the same layout the cell cache uses, so it can be read back with load_npz.
+#
+# Usage: python -m TrimorphTools.batch_convert path/to/game path/to/output [--workers N] [--sections lightmaps,bsp,...]
+
+import argparse
+import contextlib
+import io
+import os
+import struct
+import sys
+import time
+import traceback
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from .data_stream import *
+from .importers.alias.dmg_importer_alias import ImporterAliasDMG
+from .importers.kvs.dmg_importer_versusville import ImporterVersusvilleDMG
+from .importers.cell_cache import save_npz
+from .importers.cell_loader import ALL_SECTIONS
+from .importers.skin_reader import get_skin_data
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+# The first short of a skin file is its type and the second the version of its SkinCore
+SKIN_TYPES = (0, 1, 2)
+MIN_SKIN_VERSION = 263
+MAX_SKIN_VERSION = 266
+
+KIND_MAP = "map"
+KIND_CELL = "cell"
+KIND_SKIN = "skin"
+
+# Returns KIND_MAP, KIND_CELL, KIND_SKIN or None from the first bytes of a file
+def detect_kind(filepath):
+    with open(filepath, "rb") as f:
+        header = f.read(4)
+    if(header[:2] == GZIP_MAGIC):
+        try:
+            with open(filepath, "rb") as f:
+                version = SHORT.unpack_from(decompress_gzip_header(f.read(1 << 16)))[0]
+        except (OSError, zlib.error, struct.error):
+            return None
+        return KIND_CELL if version >= 1000 else KIND_MAP
+    if(len(header) == 4):
+        skin_type, skin_version = struct.unpack('>HH', header)
+        if(skin_type in SKIN_TYPES and MIN_SKIN_VERSION <= skin_version <= MAX_SKIN_VERSION):
+            return KIND_SKIN
+    return None
+
+# Only inflates enough of a gzip file to read its version header
+def decompress_gzip_header(compressed):
+    return zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(compressed, 2)
+
+def parse_file(filepath, kind, sections):
+    if(kind == KIND_SKIN):
+        stream = open_data_file(filepath)
+        data = get_skin_data(stream)
+        if(data is None):
+            raise ValueError("Unknown skin type")
+        return data
+    stream = open_gzip_data_file(filepath)
+    version = stream.read_short()
+    if(kind == KIND_CELL):
+        importer = ImporterAliasDMG if version <= 1296 else ImporterVersusvilleDMG
+        return importer.get_cell_data(stream, version, True, sections)
+    # Cells are converted as files of their own, so only the map header is parsed
+    importer = ImporterAliasDMG if version <= 791 else ImporterVersusvilleDMG
+    return importer.get_map_header(stream, version)
+
+# Runs in a worker process, errors are returned instead of raised so one bad file doesn't stop the batch
+def convert_file(filepath, kind, outpath, sections, verbose):
+    result = {"path": filepath, "kind": kind, "size": os.path.getsize(filepath), "error": None}
+    try:
+        if(verbose):
+            data = parse_file(filepath, kind, sections)
+        else:
+            # The parsers print every node they read, which would bury the summary
+            with contextlib.redirect_stdout(io.StringIO()):
+                data = parse_file(filepath, kind, sections)
+        os.makedirs(os.path.dirname(outpath), exist_ok=True)
+        save_npz(outpath, data)
+    except Exception:
+        result["error"] = traceback.format_exc(limit=1).strip().splitlines()[-1]
+    return result
+
+def find_files(directory):
+    files = []
+    for root, dirnames, filenames in os.walk(directory):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            filepath = os.path.join(root, filename)
+            kind = detect_kind(filepath)
+            if(kind is not None):
+                files.append((filepath, kind))
+    return files
+
+def convert_directory(directory, output, workers=None, sections=ALL_SECTIONS, verbose=False):
+    start = time.perf_counter()
+    files = find_files(directory)
+    print("Found " + str(len(files)) + " files in " + directory)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for filepath, kind in files:
+            outpath = os.path.join(output, os.path.relpath(filepath, directory) + ".npz")
+            futures.append(executor.submit(convert_file, filepath, kind, outpath, sections, verbose))
+        for future in futures:
+            results.append(future.result())
+    print_summary(results, time.perf_counter() - start)
+    return results
+
+def print_summary(results, seconds):
+    failures = [result for result in results if result["error"] is not None]
+    megabytes = sum(result["size"] for result in results) / (1 << 20)
+    for kind in [KIND_MAP, KIND_CELL, KIND_SKIN]:
+        count = len([result for result in results if result["kind"] == kind])
+        print("  %-5s %8d files" % (kind, count))
+    print("Converted " + str(len(results) - len(failures)) + " of " + str(len(results)) + " files (%.1f MB) in %.2f s" % (megabytes, seconds))
+    if(seconds > 0):
+        print("  %.1f files/s, %.1f MB/s" % (len(results) / seconds, megabytes / seconds))
+    if(len(failures) > 0):
+        print(str(len(failures)) + " failures:")
+        for result in failures:
+            print("  " + result["path"] + ": " + result["error"])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert Trimorph Engine locales, cells and skins without Blender.")
+    parser.add_argument("directory", help="Directory that is searched for files to convert")
+    parser.add_argument("output", help="Directory the converted files are written to")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes, one per CPU core by default")
+    parser.add_argument("--sections", default=",".join(sorted(ALL_SECTIONS)), help="Comma separated cell sections to decode, out of " + ", ".join(sorted(ALL_SECTIONS)))
+    parser.add_argument("--verbose", action="store_true", help="Show the output of the parsers")
+    args = parser.parse_args(argv)
+
+    sections = frozenset(section for section in args.sections.split(",") if section != "")
+    if(len(sections - ALL_SECTIONS) > 0):
+        parser.error("unknown sections: " + ", ".join(sorted(sections - ALL_SECTIONS)))
+    results = convert_directory(args.directory, args.output, args.workers, sections, args.verbose)
+    return 1 if any(result["error"] is not None for result in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+# Compares reading the animation tracks of a synthetic bone skin into lists of keys with reading them into arrays,
+# and times working out the keyframes of every F-curve of its Actions with get_bone_keyframes. Filling the F-curves
+# needs Blender, it's a keyframe_points.add and a foreach_set per F-curve on top of this.
+#
+# Usage: python benchmarks/bench_bone_animation.py [frames] [bone depth] [children per bone]
+
+import contextlib
+import importlib
+import io
+import os
+import random
+import sys
+import timeit
+
+import corpus_writer
+
+addon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir)
+sys.path.insert(0, os.path.dirname(os.path.abspath(addon_path)))
+addon_name = os.path.basename(os.path.abspath(addon_path))
+data_stream = importlib.import_module(addon_name + ".data_stream")
+skin_reader = importlib.import_module(addon_name + ".importers.skin_reader")
+bone_animation = importlib.import_module(addon_name + ".bone_animation")
+
+# read_bone_animation before the tracks were read into arrays
+def read_bone_animation_lists(stream):
+    bone_anim = {}
+    scale_count = stream.read_short()
+    bone_anim["scales"] = []
+    for i in range(scale_count):
+        bone_anim["scales"].append([stream.read_float(), stream.read_float(), stream.read_float()])
+    rotation_count = stream.read_short()
+    bone_anim["rotations"] = []
+    for i in range(rotation_count):
+        bone_anim["rotations"].append([stream.read_float(), stream.read_float(), stream.read_float(), stream.read_float()])
+    translation_count = stream.read_short()
+    bone_anim["translations"] = []
+    for i in range(translation_count):
+        bone_anim["translations"].append([stream.read_float(), stream.read_float(), stream.read_float()])
+    return bone_anim
+
+def read_skin(buffer):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return skin_reader.get_skin_data(data_stream.DataReader(buffer))
+
+def get_keyframes(data):
+    bones = list(bone_animation.iter_bones(data["skeleton"]["bones"]))
+    for sequence in data["anim_sequences"]:
+        for bone in bones:
+            bone_animation.get_bone_keyframes(bone, sequence["from_frame"], sequence["to_frame"])
+    return len(bones)
+
+if __name__ == "__main__":
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    bone_depth = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    bone_children = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+    writer = corpus_writer.DataWriter()
+    corpus_writer.write_skin(writer, 2, random.Random(0), vertices=200, frames=frames, bone_depth=bone_depth, bone_children=bone_children)
+    buffer = writer.get_bytes()
+    data = read_skin(buffer)
+    bone_count = get_keyframes(data)
+    print(str(bone_count) + " bones, " + str(frames) + " frames")
+
+    read_arrays = skin_reader.read_bone_animation
+    for label, read_bone_animation in [("lists", read_bone_animation_lists), ("arrays", read_arrays)]:
+        skin_reader.read_bone_animation = read_bone_animation
+        seconds = min(timeit.repeat(lambda: read_skin(buffer), number=1, repeat=5))
+        print("  %-10s %10.2f ms to read the skin" % (label, seconds * 1000))
+    skin_reader.read_bone_animation = read_arrays
+
+    seconds = min(timeit.repeat(lambda: get_keyframes(data), number=1, repeat=5))
+    print("  %-10s %10.2f ms to work out the keyframes of " % ("keyframes", seconds * 1000) + str(bone_count * 10) + " F-curves")
@@ -0,0 +1,70 @@
+# Compares parse time and retained memory of the old list based BSP reader with the array based read_bsp_nodes,
+# on a synthetic BSP tree written by corpus_writer.
+#
+# Usage: python benchmarks/bench_bsp.py [depth]
+
+import importlib
+import os
+import random
+import sys
+import timeit
+import tracemalloc
+
+import corpus_writer
+
+addon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir)
+sys.path.insert(0, os.path.dirname(os.path.abspath(addon_path)))
+addon_name = os.path.basename(os.path.abspath(addon_path))
+data_stream = importlib.import_module(addon_name + ".data_stream")
+tree_reader = importlib.import_module(addon_name + ".importers.tree_reader")
+
+# The body of read_bsp before the nodes were stored as arrays
+def read_bsp_lists(stream, node_count):
+    bsp_node = {}
+    bsp_node["ppe"] = []
+    bsp_node["n_polys"] = []
+    bsp_node["vertex_index"] = []
+    bsp_node["front"] = []
+    bsp_node["back"] = []
+    bsp_node["tex_index"] = []
+    bsp_node["i1"] = []
+    bsp_node["i2"] = []
+    for j in range(node_count):
+        bsp_node["ppe"].append([stream.read_float(), stream.read_float(), stream.read_float(), stream.read_float()])
+        bsp_node["n_polys"].append(stream.read_short())
+        vertex_index = []
+        tex_index = []
+        for k in range(bsp_node["n_polys"][j]):
+            vertex_index.append(stream.read_int())
+            tex_index.append(stream.read_short())
+        bsp_node["vertex_index"].append(vertex_index)
+        bsp_node["tex_index"].append(tex_index)
+        bsp_node["front"].append(stream.read_int())
+        bsp_node["back"].append(stream.read_int())
+        bsp_node["i1"].append(stream.read_byte())
+        bsp_node["i2"].append(stream.read_byte())
+    return bsp_node
+
+def parse(buffer, read_nodes):
+    stream = data_stream.DataReader(buffer)
+    stream.read_byte()
+    node_count = stream.read_int()
+    return read_nodes(stream, node_count)
+
+def retained_memory(buffer, read_nodes):
+    tracemalloc.start()
+    nodes = parse(buffer, read_nodes)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+if __name__ == "__main__":
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 14
+    writer = corpus_writer.DataWriter()
+    corpus_writer.write_bsp(writer, random.Random(0), depth, 10000, False)
+    buffer = writer.get_bytes()
+    print(str((1 << depth) - 1) + " nodes, " + str(len(buffer)) + " bytes")
+    for label, read_nodes in [("lists", read_bsp_lists), ("arrays", tree_reader.read_bsp_nodes)]:
+        seconds = min(timeit.repeat(lambda: parse(buffer, read_nodes), number=1, repeat=5))
+        size = retained_memory(buffer, read_nodes)
+        print("  %-8s %10.2f ms %10.1f KB retained" % (label, seconds * 1000, size / 1024))
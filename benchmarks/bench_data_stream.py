@@ -0,0 +1,74 @@
+# Microbenchmark comparing the per-primitive cost of the old stream based readers
+# (stream.read() on a BufferedReader wrapped around a GzipFile) with DataReader.
+#
+# Usage: python benchmarks/bench_data_stream.py [iterations]
+
+import gzip
+import io
+import os
+import struct
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir))
+from data_stream import DataReader
+
+# The free functions data_stream.py used to provide
+def read_string(stream):
+    length = stream.read(2)
+    length = int.from_bytes(length, byteorder='big')
+    string = stream.read(length)
+    return string.decode("utf-8")
+
+def read_int(stream):
+    return int.from_bytes(stream.read(4), byteorder='big')
+
+def read_short(stream):
+    return int.from_bytes(stream.read(2), byteorder='big')
+
+def read_bool(stream):
+    return stream.read(1) == b'\x01'
+
+def read_float(stream):
+    return struct.unpack('>f', stream.read(4))[0]
+
+def make_payload(size, count):
+    if(size == 0):
+        # Strings are stored as a short length followed by the utf-8 bytes
+        return (struct.pack('>H', 8) + b"texture1") * count
+    return b"\x01" * size * count
+
+def gzip_stream(payload):
+    return io.BufferedReader(gzip.GzipFile(fileobj=io.BytesIO(gzip.compress(payload)), mode='rb'))
+
+def read_all(read, stream, count):
+    for i in range(count):
+        read(stream)
+
+def best_time(func):
+    return min(timeit.repeat(func, number=1, repeat=3))
+
+def report(name, old_time, new_time, count):
+    print("%-12s %10.1f ns %10.1f ns %8.1fx" % (name, old_time / count * 1e9, new_time / count * 1e9, old_time / new_time))
+
+def bench(name, size, old, new, count):
+    payload = make_payload(size, count)
+    old_time = best_time(lambda: read_all(old, gzip_stream(payload), count))
+    new_time = best_time(lambda: read_all(new, DataReader(payload), count))
+    report(name, old_time, new_time, count)
+
+def bench_batch(count):
+    payload = make_payload(4, count)
+    old_time = best_time(lambda: read_all(read_float, gzip_stream(payload), count))
+    new_time = best_time(lambda: DataReader(payload).read_floats(count))
+    report("floats[N]", old_time, new_time, count)
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    print("%-12s %13s %13s %9s" % ("primitive", "stream", "DataReader", "speedup"))
+    bench("int", 4, read_int, DataReader.read_int, count)
+    bench("short", 2, read_short, DataReader.read_short, count)
+    bench("float", 4, read_float, DataReader.read_float, count)
+    bench("bool", 1, read_bool, DataReader.read_bool, count)
+    bench("string", 0, read_string, DataReader.read_string, count)
+    bench_batch(count)
@@ -0,0 +1,46 @@
+# Measures decompression throughput per MB of compressed input for the old GzipFile
+# read path, gzip.decompress and data_stream.decompress_gzip.
+#
+# Usage: python benchmarks/bench_decompress.py [file.dmg ...]
+# Without arguments a synthetic payload of float geometry is used.
+
+import gzip
+import io
+import os
+import random
+import struct
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir))
+from data_stream import decompress_gzip
+
+def make_payload(size):
+    # Quantised coordinates compress roughly like real cell geometry
+    rng = random.Random(0)
+    count = size // 4
+    return struct.pack('>%df' % count, *[rng.randrange(-2048, 2048) / 8 for i in range(count)])
+
+def read_gzip_file(compressed):
+    # The old path: many small reads through BufferedReader and GzipFile
+    stream = io.BufferedReader(gzip.GzipFile(fileobj=io.BytesIO(compressed), mode='rb'))
+    while stream.read(4):
+        pass
+
+def best_time(func):
+    return min(timeit.repeat(func, number=1, repeat=3))
+
+def bench(name, compressed):
+    megabytes = len(compressed) / (1 << 20)
+    print(name + " (" + "%.2f" % megabytes + " MB compressed)")
+    for label, func in [("GzipFile reads", read_gzip_file), ("gzip.decompress", gzip.decompress), ("decompress_gzip", decompress_gzip)]:
+        seconds = best_time(lambda: func(compressed))
+        print("  %-16s %8.1f MB/s %8.2f ms/MB" % (label, megabytes / seconds, seconds / megabytes * 1000))
+
+if __name__ == "__main__":
+    if(len(sys.argv) > 1):
+        for filepath in sys.argv[1:]:
+            with open(filepath, "rb") as f:
+                bench(filepath, f.read())
+    else:
+        bench("synthetic", gzip.compress(make_payload(16 << 20)))
@@ -0,0 +1,49 @@
+# Compares the object count, import time and viewport redraw time of the DMG import modes.
+# Has to run inside Blender, redraw times are only measured when Blender has a window:
+#
+#   blender --factory-startup --python benchmarks/bench_import_modes.py -- path/to/locale.dmg
+
+import importlib
+import os
+import sys
+import time
+
+import bpy
+
+addon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir)
+sys.path.insert(0, os.path.dirname(os.path.abspath(addon_path)))
+addon = importlib.import_module(os.path.basename(os.path.abspath(addon_path)))
+dmg_constructor = importlib.import_module(addon.__name__ + ".dmg_constructor")
+
+REDRAW_ITERATIONS = 20
+
+def clear_scene():
+    for object in list(bpy.data.objects):
+        bpy.data.objects.remove(object, do_unlink=True)
+    for mesh in list(bpy.data.meshes):
+        bpy.data.meshes.remove(mesh)
+    for material in list(bpy.data.materials):
+        bpy.data.materials.remove(material)
+    for image in list(bpy.data.images):
+        bpy.data.images.remove(image)
+
+def time_redraw():
+    if(bpy.context.window is None):
+        return None
+    start = time.perf_counter()
+    bpy.ops.wm.redraw_timer(type='DRAW_WIN_SWAP', iterations=REDRAW_ITERATIONS)
+    return (time.perf_counter() - start) / REDRAW_ITERATIONS
+
+def bench(filepath, import_mode):
+    clear_scene()
+    start = time.perf_counter()
+    dmg_constructor.read_dmg_locale(bpy.context, filepath, import_mode=import_mode)
+    import_time = time.perf_counter() - start
+    redraw_time = time_redraw()
+    redraw = "n/a" if redraw_time is None else "%.2f ms" % (redraw_time * 1000)
+    print("%-8s %8d objects %10.2f s import %12s redraw" % (import_mode, len(bpy.data.objects), import_time, redraw))
+
+if __name__ == "__main__":
+    filepath = sys.argv[sys.argv.index("--") + 1]
+    for import_mode in ['TEXTURE', 'CELL', 'LOCALE']:
+        bench(filepath, import_mode)
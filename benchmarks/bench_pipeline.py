@@ -0,0 +1,61 @@
+# Compares the wall time of loading a synthetic locale one cell after the other with the pipelined loading of
+# create_mesh_from_map, where the next cells are decompressed, parsed and prepared on a background thread.
+# Building the meshes needs Blender, so it's stood in for by sleeping for as long as each cell took to load,
+# which is when pipelining helps the most. The wall time should come close to the larger of the load and
+# build times rather than their sum, and the first cell should be ready after a single load.
+#
+# Usage: python benchmarks/bench_pipeline.py [cell count] [faces per cell]
+
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import corpus_writer
+
+addon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir)
+sys.path.insert(0, os.path.dirname(os.path.abspath(addon_path)))
+addon_name = os.path.basename(os.path.abspath(addon_path))
+data_stream = importlib.import_module(addon_name + ".data_stream")
+cell_loader = importlib.import_module(addon_name + ".importers.cell_loader")
+texture_groups = importlib.import_module(addon_name + ".texture_groups")
+ImporterVersusvilleDMG = importlib.import_module(addon_name + ".importers.kvs.dmg_importer_versusville").ImporterVersusvilleDMG
+
+def iter_prepared_cells(filepath, parallel=False):
+    stream = data_stream.open_gzip_data_file(filepath)
+    version = stream.read_short()
+    data = ImporterVersusvilleDMG.iter_map_data(stream, version, filepath, parallel=parallel, sections=frozenset(), prepare_cell=texture_groups.prepare_cell_groups)
+    return data["cells"]
+
+def run(filepath, build_seconds, pipeline, parallel=False):
+    start = time.perf_counter()
+    first_cell = None
+    cells = iter_prepared_cells(filepath, parallel)
+    if(pipeline):
+        cells = cell_loader.iter_in_background(cells)
+    for cell in cells:
+        if(first_cell is None):
+            first_cell = time.perf_counter() - start
+        time.sleep(build_seconds)
+    return time.perf_counter() - start, first_cell
+
+if __name__ == "__main__":
+    cell_count = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    faces = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    directory = tempfile.mkdtemp()
+    try:
+        corpus_writer.make_locale(directory, cells=cell_count, faces=faces, alpha_faces=faces // 10)
+        filepath = os.path.join(directory, "locale.dmg")
+        # Loading every cell without building anything gives the load time each build is set to
+        load_seconds = run(filepath, 0, False)[0]
+        build_seconds = load_seconds / cell_count
+        print(str(cell_count) + " cells, %.2f ms to load each" % (build_seconds * 1000))
+        print("  %-20s %10s %14s" % ("", "Wall (ms)", "First cell (ms)"))
+        print("  %-20s %10.1f %14s" % ("load + build", (load_seconds + build_seconds * cell_count) * 1000, ""))
+        for label, pipeline, parallel in [("sequential", False, False), ("pipelined", True, False), ("pipelined, parallel", True, True)]:
+            seconds, first_cell = run(filepath, build_seconds, pipeline, parallel)
+            print("  %-20s %10.1f %14.1f" % (label, seconds * 1000, first_cell * 1000))
+    finally:
+        shutil.rmtree(directory)
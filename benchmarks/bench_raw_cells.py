@@ -0,0 +1,52 @@
+# Compares loading the cells of a synthetic locale by decompressing them with loading them from the sidecars of a
+# RawCellStore, which are mapped into memory instead. The first load with the store also writes the sidecars.
+# Also times reading a single section straight out of every sidecar through its table of contents,
+# which is all a tool that only wants e.g. the lightmaps has to do.
+#
+# Usage: python benchmarks/bench_raw_cells.py [cell count] [faces per cell] [lightmaps per cell]
+
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import corpus_writer
+
+addon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir)
+sys.path.insert(0, os.path.dirname(os.path.abspath(addon_path)))
+addon_name = os.path.basename(os.path.abspath(addon_path))
+data_stream = importlib.import_module(addon_name + ".data_stream")
+cell_loader = importlib.import_module(addon_name + ".importers.cell_loader")
+raw_cell = importlib.import_module(addon_name + ".importers.raw_cell")
+ImporterVersusvilleDMG = importlib.import_module(addon_name + ".importers.kvs.dmg_importer_versusville").ImporterVersusvilleDMG
+
+def load_cells(directory, cell_count, raw_cells):
+    start = time.perf_counter()
+    for i in range(cell_count):
+        cell_loader.parse_cell(cell_loader.get_cell_path(os.path.join(directory, "locale.dmg"), i), ImporterVersusvilleDMG.get_cell_data, swap_lightmaps=False, raw_cells=raw_cells)
+    return time.perf_counter() - start
+
+def read_lightmaps(directory, cell_count):
+    start = time.perf_counter()
+    texels = 0
+    for i in range(cell_count):
+        lightmaps = raw_cell.open_raw_cell(os.path.join(directory, "c" + str(i) + ".dmg")).get_view("lightmaps")
+        texels += lightmaps["texels"].size
+    return time.perf_counter() - start, texels
+
+if __name__ == "__main__":
+    cell_count = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    faces = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    lightmaps = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    directory = tempfile.mkdtemp()
+    try:
+        corpus_writer.make_locale(directory, cells=cell_count, faces=faces, alpha_faces=faces // 10, lightmaps=lightmaps)
+        print(str(cell_count) + " cells of " + str(faces) + " faces and " + str(lightmaps) + " lightmaps")
+        for label, raw_cells in [("decompressed", None), ("writing sidecars", raw_cell.RawCellStore()), ("mapped sidecars", raw_cell.RawCellStore())]:
+            print("  %-18s %10.1f ms" % (label, load_cells(directory, cell_count, raw_cells) * 1000))
+        seconds, texels = read_lightmaps(directory, cell_count)
+        print("  %-18s %10.1f ms (%d texels)" % ("lightmaps only", seconds * 1000, texels))
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,56 @@
+# Measures how much cell parse time is saved by skipping each optional section
+# (lightmaps, BSP trees, portal vis trees and light trees) instead of decoding it.
+#
+# Usage: python benchmarks/bench_sections.py path/to/locale_folder_or_cell.dmg ...
+
+import contextlib
+import glob
+import importlib
+import io
+import os
+import sys
+import timeit
+
+addon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir)
+sys.path.insert(0, os.path.dirname(os.path.abspath(addon_path)))
+addon_name = os.path.basename(os.path.abspath(addon_path))
+data_stream = importlib.import_module(addon_name + ".data_stream")
+cell_loader = importlib.import_module(addon_name + ".importers.cell_loader")
+ImporterAliasDMG = importlib.import_module(addon_name + ".importers.alias.dmg_importer_alias").ImporterAliasDMG
+ImporterVersusvilleDMG = importlib.import_module(addon_name + ".importers.kvs.dmg_importer_versusville").ImporterVersusvilleDMG
+
+def get_cell_paths(paths):
+    cellpaths = []
+    for path in paths:
+        if(os.path.isdir(path)):
+            cellpaths.extend(sorted(glob.glob(os.path.join(path, "c*.dmg"))))
+        else:
+            cellpaths.append(path)
+    return cellpaths
+
+def parse(buffer, sections):
+    stream = data_stream.DataReader(buffer)
+    version = stream.read_short()
+    importer = ImporterAliasDMG if version <= 1296 else ImporterVersusvilleDMG
+    # The tree readers print every node they load, which would dominate the timings
+    with contextlib.redirect_stdout(io.StringIO()):
+        importer.get_cell_data(stream, version, True, sections)
+
+def best_time(buffers, sections):
+    return min(timeit.repeat(lambda: [parse(buffer, sections) for buffer in buffers], number=1, repeat=5))
+
+if __name__ == "__main__":
+    buffers = []
+    for cellpath in get_cell_paths(sys.argv[1:]):
+        with open(cellpath, "rb") as f:
+            buffers.append(data_stream.decompress_gzip(f.read()))
+    print(str(len(buffers)) + " cells")
+    # Warm up the allocator so the first timing isn't penalised
+    best_time(buffers, cell_loader.ALL_SECTIONS)
+    full = best_time(buffers, cell_loader.ALL_SECTIONS)
+    print("  %-16s %10.2f ms" % ("all sections", full * 1000))
+    for section in sorted(cell_loader.ALL_SECTIONS):
+        seconds = best_time(buffers, cell_loader.ALL_SECTIONS - {section})
+        print("  skip %-11s %10.2f ms %10.2f ms saved" % (section, seconds * 1000, (full - seconds) * 1000))
+    seconds = best_time(buffers, frozenset())
+    print("  %-16s %10.2f ms %10.2f ms saved" % ("geometry only", seconds * 1000, (full - seconds) * 1000))
@@ -0,0 +1,66 @@
+# Compares the buffers create_mesh_from_skin used to build for every material, each holding the whole swizzled vertex list,
+# with swizzling the vertices once and giving every material only the vertices its faces use.
+# Uploading the buffers needs Blender, so the vertex counts that would be uploaded are printed next to the build times.
+#
+# Usage: python benchmarks/bench_skin_mesh.py [vertices] [materials] [faces]
+
+import contextlib
+import importlib
+import io
+import os
+import random
+import sys
+import timeit
+
+import numpy as np
+
+import corpus_writer
+
+addon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir)
+sys.path.insert(0, os.path.dirname(os.path.abspath(addon_path)))
+addon_name = os.path.basename(os.path.abspath(addon_path))
+data_stream = importlib.import_module(addon_name + ".data_stream")
+skin_reader = importlib.import_module(addon_name + ".importers.skin_reader")
+
+# The per material loop of create_mesh_from_skin before the vertices were shared
+def build_lists(data):
+    vertex_count = 0
+    for i in range(len(data["materials"])):
+        current_verts = []
+        current_faces = []
+        current_texcoords = []
+        current_frame = data["vertex_coords"][0].ravel().tolist()
+        for j in range(0, len(current_frame), 3):
+            current_verts.append([-current_frame[j], current_frame[j+2], current_frame[j+1]])
+        for face in data["face_indices"][i].tolist():
+            current_faces.append(face)
+        texcoords = data["face_texcoords"][i].tolist()
+        for j in range(0, len(texcoords), 3):
+            current_texcoords.append(texcoords[j])
+            current_texcoords.append(texcoords[j+2])
+            current_texcoords.append(texcoords[j+1])
+        vertex_count += len(current_verts)
+    return vertex_count
+
+def build_shared(data):
+    vertex_count = 0
+    vertices = data["vertex_coords"][0][:, [0, 2, 1]]
+    vertices[:, 0] *= -1
+    for i in range(len(data["materials"])):
+        used, faces = np.unique(data["face_indices"][i], return_inverse=True)
+        texcoords = data["face_texcoords"][i].reshape(-1, 3, 2)[:, [0, 2, 1]]
+        vertex_count += len(vertices[used])
+    return vertex_count
+
+if __name__ == "__main__":
+    vertices = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    materials = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    faces = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+    writer = corpus_writer.DataWriter()
+    corpus_writer.write_skin(writer, 0, random.Random(0), vertices=vertices, materials=materials, faces=faces)
+    with contextlib.redirect_stdout(io.StringIO()):
+        data = skin_reader.get_skin_data(data_stream.DataReader(writer.get_bytes()))
+    print(str(vertices) + " vertices, " + str(materials) + " materials, " + str(faces) + " faces")
+    for label, build in [("per material", build_lists), ("shared", build_shared)]:
+        seconds = min(timeit.repeat(lambda: build(data), number=1, repeat=5))
+        print("  %-14s %10.2f ms %10d vertices uploaded" % (label, seconds * 1000, build(data)))
@@ -0,0 +1,112 @@
+# Compares the old face by face texture group split with the sliced get_texture_groups of texture_groups,
+# on a synthetic cell written by corpus_writer, and checks that both give the same groups.
+#
+# Usage: python benchmarks/bench_texture_groups.py [faces] [textures]
+
+import importlib
+import os
+import random
+import sys
+import timeit
+
+import numpy as np
+
+import corpus_writer
+
+addon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir)
+sys.path.insert(0, os.path.dirname(os.path.abspath(addon_path)))
+addon_name = os.path.basename(os.path.abspath(addon_path))
+data_stream = importlib.import_module(addon_name + ".data_stream")
+texture_groups = importlib.import_module(addon_name + ".texture_groups")
+ImporterVersusvilleDMG = importlib.import_module(addon_name + ".importers.kvs.dmg_importer_versusville").ImporterVersusvilleDMG
+create_texture_group = texture_groups.create_texture_group
+
+# get_texture_groups before the groups were sliced out of the cell
+def get_texture_groups_per_face(cell):
+    groups = []
+
+    vertices = cell["vertex"]
+    texcoord = cell["texcoord"]
+
+    # Get the faces
+    face_verts = []
+    face_texcoords = []
+    current_face = 0
+    for j in range(len(cell["texture_list"])):
+        face_verts.append([])
+        face_texcoords.append([])
+    j = 0
+    for k in range(0, len(vertices), 3):
+        if(current_face < len(cell["texture_list"])-1 and j == cell["face_start"][current_face + 1]):
+            current_face += 1
+        face_verts[current_face].append(vertices[k+0])
+        face_verts[current_face].append(vertices[k+1])
+        face_verts[current_face].append(vertices[k+2])
+        for l in [0, 2, 1]:
+            if(k+l < len(texcoord)):
+                face_texcoords[current_face].append(texcoord[k+l])
+            else:
+                face_texcoords[current_face].append([0, 0])
+        j += 1
+
+    for i in range(0, len(cell["texture_list"])):
+        groups.append(create_texture_group(cell["texture_list"][i], False, face_verts[i], face_texcoords[i]))
+
+    alpha_vertices = cell["alpha_vertex"]
+    alpha_texcoord = cell["alpha_texcoord"]
+
+    # Get the faces
+    alpha_face_verts = []
+    alpha_face_texcoords = []
+    alpha_current_face = 0
+    for j in range(len(cell["alpha_texture_list"])):
+        alpha_face_verts.append([])
+        alpha_face_texcoords.append([])
+    j = 0
+    nextStart = 0
+    if(len(cell["alpha_texture_list"]) >= 1):
+        nextStart = cell["alpha_face_count"][0]
+    for k in range(0, len(alpha_vertices), 3):
+        if(j == nextStart):
+            alpha_current_face += 1
+            if(alpha_current_face >= len(cell["alpha_texture_list"])-1):
+                nextStart += 9999999
+            else:
+                nextStart += cell["alpha_face_count"][alpha_current_face + 1]
+        alpha_face_verts[alpha_current_face].append(alpha_vertices[k])
+        alpha_face_verts[alpha_current_face].append(alpha_vertices[k+1])
+        alpha_face_verts[alpha_current_face].append(alpha_vertices[k+2])
+        for l in range(0, 3):
+            if(k+l < len(alpha_texcoord)):
+                alpha_face_texcoords[alpha_current_face].append(alpha_texcoord[k+l])
+            else:
+                alpha_face_texcoords[alpha_current_face].append([0, 0])
+        j += 1
+
+    for i in range(0, len(cell["alpha_texture_list"])):
+        groups.append(create_texture_group(cell["alpha_texture_list"][i], True, alpha_face_verts[i], alpha_face_texcoords[i]))
+
+    return groups
+
+def same_groups(groups, other_groups):
+    if(len(groups) != len(other_groups)):
+        return False
+    for group, other_group in zip(groups, other_groups):
+        if(group["texture"] != other_group["texture"] or group["alpha"] != other_group["alpha"]):
+            return False
+        if(np.array_equal(group["vertex"], other_group["vertex"]) == False or np.array_equal(group["texcoord"], other_group["texcoord"]) == False):
+            return False
+    return True
+
+if __name__ == "__main__":
+    faces = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    textures = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    writer = corpus_writer.DataWriter()
+    corpus_writer.write_cell(writer, 1298, random.Random(0), faces=faces, alpha_faces=faces // 10, textures=textures, alpha_textures=textures // 4)
+    stream = data_stream.DataReader(writer.get_bytes())
+    cell = ImporterVersusvilleDMG.get_cell_data(stream, stream.read_short(), sections=frozenset())
+    print(str(faces) + " faces, " + str(faces // 10) + " alpha faces, " + str(textures) + " textures")
+    print("  same groups: " + str(same_groups(get_texture_groups_per_face(cell), texture_groups.get_texture_groups(cell))))
+    for label, get_groups in [("per face", get_texture_groups_per_face), ("sliced", texture_groups.get_texture_groups)]:
+        seconds = min(timeit.repeat(lambda: get_groups(cell), number=1, repeat=5))
+        print("  %-10s %10.2f ms" % (label, seconds * 1000))
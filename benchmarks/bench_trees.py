@@ -0,0 +1,109 @@
+# Compares the old recursive portal vis and light tree readers with the flat node tables of tree_reader,
+# on a bushy tree written by corpus_writer and on a chain as deep as it is long, which the recursive readers
+# can't read at all once it's deeper than the recursion limit.
+#
+# Usage: python benchmarks/bench_trees.py [chain length]
+
+import importlib
+import os
+import random
+import sys
+import timeit
+import tracemalloc
+
+import corpus_writer
+
+addon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir)
+sys.path.insert(0, os.path.dirname(os.path.abspath(addon_path)))
+addon_name = os.path.basename(os.path.abspath(addon_path))
+data_stream = importlib.import_module(addon_name + ".data_stream")
+tree_reader = importlib.import_module(addon_name + ".importers.tree_reader")
+
+# read_portal_vis_node before the trees were stored as flat tables
+def read_portal_vis_node_recursive(stream):
+    portal_vis_node = {}
+    if(stream.read_int() > 0):
+        portal_vis_node["name"] = stream.read_string()
+    portal_vis_node["a"] = stream.read_int()
+    portal_var_size = stream.read_int()
+    portal_vis_node["b"] = []
+    portal_vis_node["c"] = []
+    for k in range(portal_var_size):
+        portal_vis_node["b"].append(stream.read_int())
+        portal_vis_node["c"].append(read_portal_vis_node_recursive(stream))
+    return portal_vis_node
+
+# read_light_tree before the trees were stored as flat tables
+def read_light_tree_recursive(stream):
+    light_tree = {}
+    light_tree["light_count"] = stream.read_short()
+    light_tree["light_list"] = []
+    for j in range(light_tree["light_count"]):
+        light_tree["light_list"].append(stream.read_short())
+    light_tree["x_mid"] = stream.read_int()
+    light_tree["y_mid"] = stream.read_int()
+    light_tree["z_mid"] = stream.read_int()
+    light_tree["light_quads"] = []
+    for j in range(8):
+        if(stream.read_bool()):
+            light_tree["light_quads"].append(read_light_tree_recursive(stream))
+    return light_tree
+
+def read_portal_vis_node_flat(stream):
+    return tree_reader.read_portal_vis_nodes(stream, True)
+
+# Every node but the last has a single child, written without recursing so the chain can be any length
+def write_portal_vis_chain(writer, length):
+    for i in range(length):
+        writer.write_int(0)
+        writer.write_int(i)
+        writer.write_int(1 if i < length - 1 else 0)
+        if(i < length - 1):
+            writer.write_int(i)
+
+def write_light_tree_chain(writer, length):
+    for i in range(length):
+        writer.write_short(1)
+        writer.write_short(i % 65536)
+        writer.write_ints([i, i, i])
+        writer.write_bool(i < length - 1)
+    for i in range(length):
+        for j in range(7):
+            writer.write_bool(False)
+
+def retained_memory(buffer, read_tree):
+    tracemalloc.start()
+    tree = read_tree(data_stream.DataReader(buffer))
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+def compare(label, buffer, readers):
+    print(label + ", " + str(len(buffer)) + " bytes")
+    for name, read_tree in readers:
+        try:
+            seconds = min(timeit.repeat(lambda: read_tree(data_stream.DataReader(buffer)), number=1, repeat=3))
+        except RecursionError:
+            print("  %-10s exceeds the recursion limit" % name)
+            continue
+        size = retained_memory(buffer, read_tree)
+        print("  %-10s %10.2f ms %10.1f KB retained" % (name, seconds * 1000, size / 1024))
+
+if __name__ == "__main__":
+    length = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    portal_readers = [("recursive", read_portal_vis_node_recursive), ("flat", read_portal_vis_node_flat)]
+    light_readers = [("recursive", read_light_tree_recursive), ("flat", tree_reader.read_light_tree_nodes)]
+
+    writer = corpus_writer.DataWriter()
+    corpus_writer.write_portal_vis_node(writer, random.Random(0), 22, False)
+    compare("Bushy portal vis tree", writer.get_bytes(), portal_readers)
+    writer = corpus_writer.DataWriter()
+    corpus_writer.write_light_tree(writer, random.Random(3), 14)
+    compare("Bushy light tree", writer.get_bytes(), light_readers)
+
+    writer = corpus_writer.DataWriter()
+    write_portal_vis_chain(writer, length)
+    compare("Portal vis chain of " + str(length) + " nodes", writer.get_bytes(), portal_readers)
+    writer = corpus_writer.DataWriter()
+    write_light_tree_chain(writer, length)
+    compare("Light tree chain of " + str(length) + " nodes", writer.get_bytes(), light_readers)
@@ -0,0 +1,79 @@
+# Compares parse time and retained memory of the old reader that made a dict per waypoint with the columnar
+# read_waypoints, on a synthetic map header written by corpus_writer.
+#
+# Usage: python benchmarks/bench_waypoints.py [waypoint count]
+
+import importlib
+import os
+import random
+import sys
+import timeit
+import tracemalloc
+
+import corpus_writer
+
+addon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir)
+sys.path.insert(0, os.path.dirname(os.path.abspath(addon_path)))
+addon_name = os.path.basename(os.path.abspath(addon_path))
+data_stream = importlib.import_module(addon_name + ".data_stream")
+waypoint_reader = importlib.import_module(addon_name + ".importers.waypoint_reader")
+
+VERSION = 805
+
+# The waypoint loop of get_map_header before waypoints were read into arrays
+def read_waypoint_dicts(stream, version, waypoint_count):
+    waypoints = []
+    for i in range(waypoint_count):
+        waypoint = {}
+        waypoint["list_index"] = i
+        waypoint["position"] = [stream.read_float(), stream.read_float(), stream.read_float()]
+        waypoint["cell_id"] = stream.read_int()
+        if(version > 793):
+            waypoint["sequence"] = stream.read_int()
+        if(version > 800):
+            linked_indices_count = stream.read_int()
+            if(linked_indices_count > 0):
+                waypoint["linked_indices"] = []
+                for j in range(linked_indices_count):
+                    waypoint["linked_indices"].append(stream.read_int())
+        if(version > 802):
+            waypoint["group_id"] = stream.read_int()
+        if(version > 804):
+            waypoint["leading_id"] = stream.read_int()
+            waypoint["trailing_id"] = stream.read_int()
+            waypoint["racing_offset"] = stream.read_float()
+            waypoint["overtaking_offset"] = stream.read_float()
+        waypoint["type_flags"] = stream.read_long()
+        names = []
+        for bit in range(9):
+            if(waypoint["type_flags"] & (1 << bit)):
+                names.append(waypoint_reader.WAYPOINT_FLAG_NAMES[bit])
+        waypoint["type_flag_string"] = "| ".join(names) if len(names) > 0 else "<none>"
+        waypoints.append(waypoint)
+    return waypoints
+
+def parse(buffer, offset, waypoint_count, read_waypoints):
+    stream = data_stream.DataReader(buffer, offset)
+    return read_waypoints(stream, VERSION, waypoint_count)
+
+def retained_memory(buffer, offset, waypoint_count, read_waypoints):
+    tracemalloc.start()
+    waypoints = parse(buffer, offset, waypoint_count, read_waypoints)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+if __name__ == "__main__":
+    waypoint_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    writer = corpus_writer.DataWriter()
+    corpus_writer.write_map(writer, VERSION, random.Random(0), 0, waypoint_count)
+    buffer = writer.get_bytes()
+    # The waypoints are the end of the header, so they start where the same header without any waypoints ends
+    writer = corpus_writer.DataWriter()
+    corpus_writer.write_map(writer, VERSION, random.Random(0), 0, 0)
+    offset = len(writer.get_bytes())
+    print(str(waypoint_count) + " waypoints, " + str(len(buffer) - offset) + " bytes")
+    for label, read_waypoints in [("dicts", read_waypoint_dicts), ("arrays", waypoint_reader.read_waypoints)]:
+        seconds = min(timeit.repeat(lambda: parse(buffer, offset, waypoint_count, read_waypoints), number=1, repeat=5))
+        size = retained_memory(buffer, offset, waypoint_count, read_waypoints)
+        print("  %-8s %10.2f ms %10.1f KB retained" % (label, seconds * 1000, size / 1024))
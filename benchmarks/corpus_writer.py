@@ -0,0 +1,493 @@
+# Writes synthetic locales and skins that the importers can read, so they can be benchmarked and
+# regression-tested at any scale without the original game assets. The contents are random but seeded,
+# so the same options always produce the same files.
+#
+# Every version the importers branch on is covered: maps 791 (Alias), 804 (Minigolf) and 805 (Versusville),
+# cells 1296 (Alias) and 1298 (Versusville/Minigolf), and static, shape and bone skins.
+#
+# Usage: python benchmarks/corpus_writer.py path/to/output [--faces N] [--textures N] [--portals N] [--lightmaps N] ...
+
+import argparse
+import gzip
+import math
+import os
+import random
+import struct
+
+SHORT = struct.Struct('>H')
+INT = struct.Struct('>I')
+LONG = struct.Struct('>Q')
+FLOAT = struct.Struct('>f')
+BYTE = struct.Struct('>B')
+
+LIGHTMAP_TEXELS = 65536
+
+# Every (map version, cell version) pair the importers have a separate code path for
+LOCALE_VERSIONS = [(791, 1296), (804, 1298), (805, 1298)]
+SKIN_TYPES = [0, 1, 2]
+
+# Geometry is laid out on a grid with this spacing, so neighbouring faces share their corners
+GRID_SPACING = 64.0
+
+class DataWriter():
+    """Writes big-endian values into an in-memory buffer, the counterpart of data_stream.DataReader."""
+
+    def __init__(self):
+        self.parts = []
+
+    def get_bytes(self):
+        return b"".join(self.parts)
+
+    def write(self, data):
+        self.parts.append(data)
+
+    def write_string(self, value):
+        data = value.encode("utf-8")
+        self.write_short(len(data))
+        self.parts.append(data)
+
+    def write_char(self, value):
+        self.parts.append(SHORT.pack(value))
+
+    def write_int(self, value):
+        self.parts.append(INT.pack(value & 0xFFFFFFFF))
+
+    def write_short(self, value):
+        self.parts.append(SHORT.pack(value & 0xFFFF))
+
+    def write_long(self, value):
+        self.parts.append(LONG.pack(value))
+
+    def write_bool(self, value):
+        self.parts.append(b'\x01' if value else b'\x00')
+
+    def write_float(self, value):
+        self.parts.append(FLOAT.pack(value))
+
+    def write_byte(self, value):
+        self.parts.append(BYTE.pack(value))
+
+    def write_floats(self, values):
+        self.parts.append(struct.pack('>%df' % len(values), *values))
+
+    def write_ints(self, values):
+        self.parts.append(struct.pack('>%dI' % len(values), *values))
+
+    def write_shorts(self, values):
+        self.parts.append(struct.pack('>%dH' % len(values), *values))
+
+def write_gzip_file(filepath, writer):
+    with open(filepath, "wb") as f:
+        f.write(gzip.compress(writer.get_bytes(), compresslevel=6))
+
+def write_data_file(filepath, writer):
+    with open(filepath, "wb") as f:
+        f.write(writer.get_bytes())
+
+# Splits total into count ranges, returned as (start, length) pairs
+def split_range(rng, total, count):
+    if(count <= 0):
+        return []
+    starts = [0] + sorted(rng.sample(range(1, total), min(count - 1, max(total - 1, 0))))
+    while len(starts) < count:
+        starts.append(total)
+    ranges = []
+    for i in range(count):
+        end = starts[i + 1] if i + 1 < count else total
+        ranges.append((starts[i], end - starts[i]))
+    return ranges
+
+# Returns face_count triangles as a flat list of xyz floats, two triangles per grid square
+def get_grid_triangles(rng, face_count, height):
+    width = max(1, int(math.sqrt(face_count / 2)))
+    corners = {}
+    def corner(x, z):
+        if((x, z) not in corners):
+            corners[(x, z)] = [x * GRID_SPACING, height + rng.uniform(-8, 8), z * GRID_SPACING]
+        return corners[(x, z)]
+    values = []
+    for i in range(face_count):
+        square = i // 2
+        x = square % width
+        z = square // width
+        if(i % 2 == 0):
+            triangle = [corner(x, z), corner(x + 1, z), corner(x + 1, z + 1)]
+        else:
+            triangle = [corner(x, z), corner(x + 1, z + 1), corner(x, z + 1)]
+        for point in triangle:
+            values.extend(point)
+    return values
+
+# Texcoords follow the x and z of each vertex, so textures tile across the grid
+def get_grid_texcoords(vertices):
+    values = []
+    for i in range(0, len(vertices), 3):
+        values.append(vertices[i] / (GRID_SPACING * 4))
+        values.append(vertices[i + 2] / (GRID_SPACING * 4))
+    return values
+
+def write_map(writer, version, rng, cell_count, waypoint_count=10, light_count=2):
+    writer.write_short(version)
+    writer.write_int(rng.randrange(1 << 16))
+    writer.write_string("synthetic_world")
+    if(version >= 800):
+        writer.write_string("synthetic_game")
+    writer.write_long(1000000000000)
+    writer.write_int(cell_count)
+    writer.write_ints([0, 0, 0])
+    writer.write_ints([4096, 1024, 4096])
+    writer.write_bool(True)
+    writer.write_string("music\\theme.mid")
+    writer.write_bool(True)
+    writer.write_string("#synthetic")
+    writer.write_bool(False)
+    writer.write_bool(True)
+    writer.write_string("A synthetic locale")
+    writer.write_int(8)
+    for i in range(4):
+        writer.write_bool(False)
+    writer.write_int(cell_count)
+    for i in range(cell_count):
+        writer.write_string("entry" + str(i))
+        writer.write_floats([rng.uniform(-100, 100) for j in range(3)])
+        writer.write_floats([0, rng.uniform(0, 360), 0])
+        writer.write_string("c" + str(i))
+        writer.write_int(i % 2)
+    writer.write_floats([0.5, 0.5, 0.5, 1.0])
+    writer.write_short(light_count)
+    if(light_count > 0):
+        writer.write_bool(True)
+        if(version >= 802):
+            writer.write_bool(True)
+        for i in range(light_count):
+            writer.write_byte(i % 3)
+            writer.write_ints([rng.randrange(4096) for j in range(3)])
+            writer.write_float(rng.uniform(0.5, 2))
+            writer.write_shorts([rng.randrange(256) for j in range(3)])
+            writer.write_short(10)
+            writer.write_short(1000)
+            writer.write_byte(i % 2)
+            writer.write_string("light" + str(i))
+            writer.write_byte(1)
+            writer.write_string("c0")
+    if(version <= 791):
+        # Alias maps have a block of unknown data here instead of waypoints
+        writer.write_bool(False)
+        return
+    writer.write_int(waypoint_count)
+    for i in range(waypoint_count):
+        writer.write_floats([rng.uniform(-1000, 1000) for j in range(3)])
+        writer.write_int(rng.randrange(max(cell_count, 1)))
+        if(version > 793):
+            writer.write_int(i)
+        if(version > 800):
+            linked = [j for j in [i - 1, i + 1] if 0 <= j < waypoint_count]
+            writer.write_int(len(linked))
+            writer.write_ints(linked)
+        if(version > 802):
+            writer.write_int(i % 4)
+        if(version > 804):
+            writer.write_int((i - 1) % waypoint_count)
+            writer.write_int((i + 1) % waypoint_count)
+            writer.write_float(rng.uniform(-50, 50))
+            writer.write_float(rng.uniform(-50, 50))
+        writer.write_long(rng.randrange(512))
+
+# Cells up to version 1296 are read by the Alias importer and the rest by the Versusville importer
+def write_cell(writer, version, rng, index=0, faces=200, alpha_faces=20, textures=4, alpha_textures=2, portals=2, lightmaps=0, bsp_depth=4, vis_depth=2, light_depth=2):
+    alias = version <= 1296
+    textures = min(textures, max(faces, 1))
+    alpha_textures = min(alpha_textures, alpha_faces)
+    writer.write_short(version)
+    writer.write_ints([index * 1024, 0, 0])
+    writer.write_ints([1024, 512, 1024])
+    writer.write_ints([0, 1024, 0, 512, 0, 1024])
+    writer.write_int(index)
+    writer.write_string("cell" + str(index))
+    writer.write_int(faces + alpha_faces)
+    writer.write_int(faces)
+    writer.write_int(alpha_faces)
+    writer.write_short(textures)
+    writer.write_short(alpha_textures)
+    writer.write_int(portals)
+    if(version >= 1296):
+        writer.write_float(9.81)
+        writer.write_bool(True)
+        writer.write_string("#cell" + str(index))
+    for i, (start, count) in enumerate(split_range(rng, faces, textures)):
+        writer.write_string("textures\\opaque" + str(i) + ".png")
+        writer.write_int(start)
+        writer.write_int(count)
+    for i, (start, count) in enumerate(split_range(rng, alpha_faces, alpha_textures)):
+        writer.write_string("textures\\alpha" + str(i) + ".tga")
+        writer.write_int(count)
+
+    vertices = get_grid_triangles(rng, faces, 0)
+    alpha_vertices = get_grid_triangles(rng, alpha_faces, 128)
+    writer.write_floats(vertices + [rng.uniform(0, 1024) for i in range(portals * 2 * 9)])
+    writer.write_floats(get_grid_texcoords(vertices))
+    if(alias == False):
+        writer.write_floats([rng.random() for i in range(faces * 9)])
+    writer.write_floats(alpha_vertices)
+    writer.write_floats(get_grid_texcoords(alpha_vertices))
+    if(alias == False):
+        writer.write_floats([rng.random() for i in range(alpha_faces * 9)])
+
+    writer.write_bool(bsp_depth > 0)
+    if(bsp_depth > 0):
+        if(alias):
+            writer.write_short(2)
+            write_quad(writer, rng, bsp_depth)
+        else:
+            write_bsp(writer, rng, bsp_depth, faces, alias)
+    writer.write_bool(bsp_depth > 0)
+    if(bsp_depth > 0):
+        write_bsp(writer, rng, bsp_depth, alpha_faces, alias)
+    for i in range(portals):
+        writer.write_floats([0, 0, 1, rng.uniform(0, 1024)])
+        writer.write_floats([rng.uniform(0, 1024) for j in range(3)])
+        writer.write_float(rng.uniform(16, 256))
+        writer.write_int(rng.randrange(1 << 16))
+        writer.write_string("portal" + str(i))
+        write_portal_vis_node(writer, rng, vis_depth, alias)
+    writer.write_bool(light_depth > 0)
+    if(light_depth > 0):
+        write_light_tree(writer, rng, light_depth)
+    writer.write_int(lightmaps)
+    for i in range(lightmaps):
+        writer.write_int(i)
+        writer.write(rng.randbytes(LIGHTMAP_TEXELS * 2))
+    if(lightmaps > 0):
+        writer.write_floats([rng.random() for i in range(faces * 6)])
+        writer.write_shorts([i % lightmaps for i in range(textures)])
+        writer.write_floats([rng.random() for i in range(alpha_faces * 6)])
+        writer.write_short(0)
+
+# The nodes form a complete binary tree of the given depth, with every node pointing at its children by index
+def write_bsp(writer, rng, depth, face_count, alias):
+    node_count = (1 << depth) - 1
+    if(alias):
+        writer.write_short(4)
+    else:
+        writer.write_byte(4)
+    writer.write_int(node_count)
+    for i in range(node_count):
+        writer.write_floats([rng.uniform(-1, 1), rng.uniform(-1, 1), rng.uniform(-1, 1), rng.uniform(-1024, 1024)])
+        polygon_count = rng.randrange(4) if face_count > 0 else 0
+        writer.write_short(polygon_count)
+        for j in range(polygon_count):
+            writer.write_int(rng.randrange(face_count))
+            writer.write_short(rng.randrange(8))
+        front = i * 2 + 1
+        back = i * 2 + 2
+        writer.write_int(front if front < node_count else -1)
+        writer.write_int(back if back < node_count else -1)
+        writer.write_byte(rng.randrange(2))
+        writer.write_byte(rng.randrange(2))
+
+def write_quad(writer, rng, depth):
+    writer.write_byte(2)
+    writer.write_byte(rng.randrange(2))
+    writer.write_int(rng.randrange(1024))
+    writer.write_ints([rng.randrange(1024) for i in range(3)])
+    writer.write_ints([rng.randrange(1024) for i in range(3)])
+    for i in range(2):
+        count = rng.randrange(4)
+        writer.write_short(count)
+        for j in range(count):
+            writer.write_int(rng.randrange(1024))
+            writer.write_short(rng.randrange(8))
+    for i in range(2):
+        writer.write_bool(depth > 1)
+        if(depth > 1):
+            write_quad(writer, rng, depth - 1)
+
+def write_portal_vis_node(writer, rng, depth, alias):
+    if(alias == False):
+        has_name = rng.random() < 0.5
+        writer.write_int(1 if has_name else 0)
+        if(has_name):
+            writer.write_string("vis")
+    writer.write_int(rng.randrange(1024))
+    child_count = rng.randrange(1, 3) if depth > 0 else 0
+    writer.write_int(child_count)
+    for i in range(child_count):
+        writer.write_int(rng.randrange(1024))
+        write_portal_vis_node(writer, rng, depth - 1, alias)
+
+def write_light_tree(writer, rng, depth):
+    light_count = rng.randrange(4)
+    writer.write_short(light_count)
+    writer.write_shorts(list(range(light_count)))
+    writer.write_ints([rng.randrange(4096) for i in range(3)])
+    for i in range(8):
+        has_child = depth > 1 and rng.random() < 0.25
+        writer.write_bool(has_child)
+        if(has_child):
+            write_light_tree(writer, rng, depth - 1)
+
+def write_skin_core(writer, rng, vertex_count, materials=3, faces=40, version=266):
+    writer.write_short(version)
+    writer.write_long(1000000000000)
+    writer.write_string("synthetic_skin")
+    writer.write_shorts([30, 60, 20, 60, 20, 40])
+    writer.write_bool(True)
+    writer.write_floats([1, 1, 1])
+    writer.write_bool(False)
+    writer.write_bool(True)
+    writer.write_floats([0, 0, 0])
+    writer.write_bool(False)
+    if(version > 263):
+        writer.write_bool(False)
+    if(version < 265):
+        writer.write_bool(True)
+    else:
+        writer.write_int(2)
+    writer.write_short(materials)
+    for i in range(materials):
+        writer.write_short(257)
+        writer.write_string("material" + str(i))
+        writer.write_bool(False)
+        writer.write_bool(True)
+        writer.write_string("skins\\material" + str(i) + ".png")
+    material_faces = [count for start, count in split_range(rng, faces, materials)]
+    for count in material_faces:
+        writer.write_short(count * 3)
+        for j in range(count * 3):
+            writer.write_char(rng.randrange(vertex_count))
+    for count in material_faces:
+        writer.write_short(count * 6)
+        writer.write_floats([rng.random() for j in range(count * 6)])
+    for count in material_faces:
+        writer.write_short(count * 9)
+        if(version >= 266):
+            writer.write_floats([rng.random() for j in range(count * 9)])
+    # No contact points and no LOD
+    writer.write_short(0)
+    writer.write_bool(False)
+
+def write_animation(writer, name, from_frame, to_frame):
+    writer.write_short(258)
+    writer.write_string(name)
+    writer.write_string("Synthetic " + name + " animation")
+    writer.write_short(from_frame)
+    writer.write_short(to_frame)
+    writer.write_float(1.0)
+    writer.write_float(0.5)
+    writer.write_short(50)
+    writer.write_short(60)
+    writer.write_short(30)
+
+# Every bone has a keyframe per frame, rotating a little further around its own axis each frame
+def write_bone(writer, rng, depth, children, frames, vertex_count, next_id):
+    bone_id = next_id[0]
+    next_id[0] += 1
+    writer.write_int(bone_id)
+    writer.write_string("bone" + str(bone_id))
+    vertices = rng.sample(range(vertex_count), min(4, vertex_count))
+    writer.write_short(len(vertices))
+    writer.write_floats([1.0 / len(vertices)] * len(vertices))
+    writer.write_short(len(vertices))
+    writer.write_ints(vertices)
+    writer.write_floats([1, 1, 1])
+    writer.write_floats([0, 0, 0, 1])
+    writer.write_floats([rng.uniform(-10, 10), rng.uniform(5, 20), rng.uniform(-10, 10)])
+    writer.write_short(children if depth > 1 else 0)
+    if(depth > 1):
+        for i in range(children):
+            write_bone(writer, rng, depth - 1, children, frames, vertex_count, next_id)
+    writer.write_short(frames)
+    writer.write_floats([1.0] * (frames * 3))
+    writer.write_short(frames)
+    axis = rng.randrange(3)
+    for i in range(frames):
+        angle = math.pi * i / max(frames, 1) / 4
+        rotation = [0.0, 0.0, 0.0, math.cos(angle)]
+        rotation[axis] = math.sin(angle)
+        writer.write_floats(rotation)
+    writer.write_short(frames)
+    writer.write_floats([rng.uniform(-1, 1) for i in range(frames * 3)])
+
+# Shape skins get one vertex frame per animation frame, each a small ripple of the first
+def write_skin(writer, skin_type, rng, vertices=100, materials=3, faces=40, frames=8, bone_depth=3, bone_children=2):
+    writer.write_short(skin_type)
+    write_skin_core(writer, rng, vertices, materials, faces)
+    base = [rng.uniform(-50, 50) for i in range(vertices * 3)]
+    if(skin_type == 0):
+        writer.write_short(258)
+        writer.write_short(len(base))
+        writer.write_floats(base)
+    elif(skin_type == 1):
+        writer.write_short(258)
+        writer.write_short(frames)
+        for frame in range(frames):
+            writer.write_short(len(base))
+            writer.write_floats([value + math.sin(frame + i) for i, value in enumerate(base)])
+        writer.write_short(30)
+        writer.write_short(2)
+        write_animation(writer, "idle", 0, frames // 2)
+        write_animation(writer, "walk", frames // 2, frames - 1)
+    else:
+        writer.write_short(1)
+        writer.write_int(len(base))
+        writer.write_floats(base)
+        writer.write_short(1)
+        write_bone(writer, rng, bone_depth, bone_children, frames, vertices, [0])
+        writer.write_short(30)
+        writer.write_short(1)
+        write_animation(writer, "run", 0, frames - 1)
+
+# Writes locale.dmg and its cells c0.dmg ... cN.dmg into directory
+def make_locale(directory, map_version=805, cell_version=1298, cells=3, seed=0, **options):
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    writer = DataWriter()
+    write_map(writer, map_version, rng, cells)
+    write_gzip_file(os.path.join(directory, "locale.dmg"), writer)
+    for i in range(cells):
+        writer = DataWriter()
+        write_cell(writer, cell_version, rng, i, **options)
+        write_gzip_file(os.path.join(directory, "c" + str(i) + ".dmg"), writer)
+
+def make_skin(filepath, skin_type, seed=0, **options):
+    rng = random.Random(seed)
+    writer = DataWriter()
+    write_skin(writer, skin_type, rng, **options)
+    write_data_file(filepath, writer)
+
+# Writes a locale for every map version and a skin of every type. The directories mirror a game install,
+# with the locales in maps/ and the skins in skins/, and an empty texture/ folder next to them
+def make_corpus(directory, seed=0, cells=3, skin_options=None, **cell_options):
+    if(skin_options is None):
+        skin_options = {}
+    for map_version, cell_version in LOCALE_VERSIONS:
+        make_locale(os.path.join(directory, "maps", "locale" + str(map_version)), map_version, cell_version, cells, seed + map_version, **cell_options)
+    os.makedirs(os.path.join(directory, "skins"), exist_ok=True)
+    for skin_type in SKIN_TYPES:
+        make_skin(os.path.join(directory, "skins", "skin" + str(skin_type) + ".dma"), skin_type, seed + skin_type, **skin_options)
+    os.makedirs(os.path.join(directory, "texture"), exist_ok=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic corpus of locales and skins.")
+    parser.add_argument("directory")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cells", type=int, default=3, help="Cells per locale")
+    parser.add_argument("--faces", type=int, default=200, help="Opaque faces per cell")
+    parser.add_argument("--alpha-faces", type=int, default=20, help="Alpha faces per cell")
+    parser.add_argument("--textures", type=int, default=4, help="Opaque textures per cell")
+    parser.add_argument("--alpha-textures", type=int, default=2, help="Alpha textures per cell")
+    parser.add_argument("--portals", type=int, default=2, help="Portals per cell")
+    parser.add_argument("--lightmaps", type=int, default=0, help="Lightmaps per cell")
+    parser.add_argument("--bsp-depth", type=int, default=4, help="Depth of the BSP trees and QBTrees, 0 leaves them out")
+    parser.add_argument("--vis-depth", type=int, default=2, help="Depth of the portal vis trees")
+    parser.add_argument("--light-depth", type=int, default=2, help="Depth of the light trees, 0 leaves them out")
+    parser.add_argument("--skin-vertices", type=int, default=100)
+    parser.add_argument("--skin-faces", type=int, default=40)
+    parser.add_argument("--skin-frames", type=int, default=8)
+    args = parser.parse_args()
+
+    make_corpus(args.directory, args.seed, args.cells,
+        skin_options={"vertices": args.skin_vertices, "faces": args.skin_faces, "frames": args.skin_frames},
+        faces=args.faces, alpha_faces=args.alpha_faces, textures=args.textures, alpha_textures=args.alpha_textures,
+        portals=args.portals, lightmaps=args.lightmaps, bsp_depth=args.bsp_depth, vis_depth=args.vis_depth, light_depth=args.light_depth)
+    print("Wrote corpus to " + args.directory)
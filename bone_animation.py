@@ -0,0 +1,53 @@
+import numpy as np
+
+# Walks a bone hierarchy depth first, every bone comes before its children
+def iter_bones(bones):
+    stack = list(reversed(bones))
+    while len(stack) > 0:
+        bone = stack.pop()
+        yield bone
+        stack.extend(reversed(bone["children"]))
+
+# Tracks hold a key per frame of the whole skin. A frame past the end of a track holds its last key
+def get_track_keys(track, frames):
+    return track[np.minimum(frames, len(track) - 1)]
+
+# Multiplies (N, 4) w, x, y, z quaternions
+def multiply_quaternions(a, b):
+    aw, ax, ay, az = a[:, 0], a[:, 1], a[:, 2], a[:, 3]
+    bw, bx, by, bz = b[:, 0], b[:, 1], b[:, 2], b[:, 3]
+    return np.stack([
+        aw * bw - ax * bx - ay * by - az * bz,
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx,
+        aw * bz + ax * by - ay * bx + az * bw,
+    ], axis=1)
+
+# Returns the keyframes of a bone between from_frame and to_frame as a list of (channel, values) pairs, where values is
+# an (N, width) array with a row per frame. Bones rest in the armature without their rotation and scale, with their
+# translation swizzled into Blender's axes as [z, y, -x], see create_bone_hierarchy. The keys are stored as changes
+# from that rest pose in the same axes, so a key equal to the rest transform of the bone leaves it where it is.
+# Channels without any keys are left out
+def get_bone_keyframes(bone, from_frame, to_frame):
+    frames = np.arange(from_frame, to_frame + 1)
+    animation = bone["animation"]
+    keyframes = []
+
+    if(len(animation["translations"]) > 0):
+        translations = get_track_keys(animation["translations"], frames) - np.array(bone["translation"], dtype=np.float32)
+        keyframes.append(("location", np.stack([translations[:, 2], translations[:, 1], -translations[:, 0]], axis=1)))
+
+    if(len(animation["rotations"]) > 0):
+        # x, y, z, w quaternions turn into w, x, y, z ones, with their axes swizzled like the translations
+        rotations = get_track_keys(animation["rotations"], frames)
+        rotations = np.stack([rotations[:, 3], rotations[:, 2], rotations[:, 1], -rotations[:, 0]], axis=1)
+        rest = bone["rotation"]
+        inverse_rest = np.array([[rest[3], -rest[2], -rest[1], rest[0]]], dtype=np.float32)
+        keyframes.append(("rotation_quaternion", multiply_quaternions(inverse_rest, rotations)))
+
+    if(len(animation["scales"]) > 0):
+        scales = get_track_keys(animation["scales"], frames)
+        rest = np.array(bone["scale"], dtype=np.float32)
+        scales = scales / np.where(rest == 0, 1, rest)
+        keyframes.append(("scale", scales[:, [2, 1, 0]]))
+    return keyframes
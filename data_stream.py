@@ -1,28 +1,141 @@
 import struct
+import zlib
+import numpy as np
 
-def read_string(stream):
-    length = stream.read(2)
-    length = int.from_bytes(length, byteorder='big')
-    string = stream.read(length)
-    return string.decode("utf-8")
+SHORT = struct.Struct('>H')
+INT = struct.Struct('>I')
+LONG = struct.Struct('>Q')
+FLOAT = struct.Struct('>f')
+BYTE = struct.Struct('>B')
+GZIP_SIZE = struct.Struct('<I')
 
-def read_char(stream):
-    return int.from_bytes(stream.read(2), byteorder='big')
+# Compressed input is fed to zlib in blocks of this size
+DECOMPRESS_CHUNK = 1 << 20
 
-def read_int(stream):
-    return int.from_bytes(stream.read(4), byteorder='big')
+# Every lightmap is a 256x256 grid of 16 bit texels, stored after an int index
+LIGHTMAP_TEXELS = 65536
+LIGHTMAP_DTYPE = np.dtype([("index", '>u4'), ("texels", '>u2', (LIGHTMAP_TEXELS,))])
 
-def read_short(stream):
-    return int.from_bytes(stream.read(2), byteorder='big')
+def open_data_file(filepath):
+    with open(filepath, "rb") as f:
+        return DataReader(f.read())
 
-def read_long(stream):
-    return int.from_bytes(stream.read(8), byteorder='big')
+def open_gzip_data_file(filepath):
+    with open(filepath, "rb") as f:
+        return DataReader(decompress_gzip(f.read()))
 
-def read_bool(stream):
-    return stream.read(1) == b'\x01'
+def decompress_gzip(compressed):
+    # The output is preallocated from the ISIZE trailer, which only holds the size of the last member modulo 4 GiB,
+    # so for multi-member or very large files the buffer grows as needed and is trimmed at the end
+    compressed = memoryview(compressed)
+    output = bytearray(GZIP_SIZE.unpack_from(compressed, len(compressed) - 4)[0] if len(compressed) >= 4 else 0)
+    written = 0
+    position = 0
+    while position < len(compressed):
+        # Members can be padded with zeroes
+        if(compressed[position] == 0):
+            position += 1
+            continue
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        while not decompressor.eof:
+            if(position >= len(compressed)):
+                raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+            block = compressed[position:position + DECOMPRESS_CHUNK]
+            chunk = decompressor.decompress(block)
+            end = written + len(chunk)
+            output[written:end] = chunk
+            written = end
+            position += len(block) - len(decompressor.unused_data)
+    del output[written:]
+    return output
 
-def read_float(stream):
-    return struct.unpack('>f', stream.read(4))[0]
+class DataReader():
+    """Reads big-endian values by offset from a file that is held entirely in memory."""
 
-def read_byte(stream):
-    return int.from_bytes(stream.read(1), byteorder='big')
+    def __init__(self, buffer, offset=0):
+        self.buffer = memoryview(buffer)
+        self.offset = offset
+
+    def read(self, size):
+        start = self.offset
+        self.offset = start + size
+        return self.buffer[start:self.offset]
+
+    def skip(self, size):
+        self.offset += size
+
+    def read_string(self):
+        length = SHORT.unpack_from(self.buffer, self.offset)[0]
+        start = self.offset + 2
+        self.offset = start + length
+        return str(self.buffer[start:self.offset], "utf-8")
+
+    def skip_string(self):
+        self.offset += 2 + SHORT.unpack_from(self.buffer, self.offset)[0]
+
+    def read_char(self):
+        value = SHORT.unpack_from(self.buffer, self.offset)[0]
+        self.offset += 2
+        return value
+
+    def read_int(self):
+        value = INT.unpack_from(self.buffer, self.offset)[0]
+        self.offset += 4
+        return value
+
+    def read_short(self):
+        value = SHORT.unpack_from(self.buffer, self.offset)[0]
+        self.offset += 2
+        return value
+
+    def read_long(self):
+        value = LONG.unpack_from(self.buffer, self.offset)[0]
+        self.offset += 8
+        return value
+
+    def read_bool(self):
+        value = self.buffer[self.offset] == 1
+        self.offset += 1
+        return value
+
+    def read_float(self):
+        value = FLOAT.unpack_from(self.buffer, self.offset)[0]
+        self.offset += 4
+        return value
+
+    def read_byte(self):
+        value = self.buffer[self.offset]
+        self.offset += 1
+        return value
+
+    def read_array(self, dtype, count):
+        # Returns a view of count big-endian values, without copying them
+        array = np.frombuffer(self.buffer, dtype=dtype, count=count, offset=self.offset)
+        self.offset += array.nbytes
+        return array
+
+    def read_ints(self, count):
+        return self.read_array('>u4', count).astype(np.uint32)
+
+    def read_shorts(self, count):
+        return self.read_array('>u2', count).astype(np.uint16)
+
+    def read_floats(self, count):
+        return self.read_array('>f4', count).astype(np.float32)
+
+    def read_vectors(self, count):
+        # Reads count floats as xyz triples and swizzles them into Blender's axes as [-x, z, y]
+        raw = self.read_array('>f4', count).reshape(-1, 3)
+        vectors = np.empty(raw.shape, dtype=np.float32)
+        vectors[:, 0] = -raw[:, 0]
+        vectors[:, 1] = raw[:, 2]
+        vectors[:, 2] = raw[:, 1]
+        return vectors
+
+    def read_lightmaps(self, count, swap=True):
+        # Reads every lightmap in one block and returns a (count, 65536) uint16 array.
+        # With swap=False the texels stay a big-endian view onto the raw bytes, call .astype(np.uint16) to swap them later
+        block = self.read_array(LIGHTMAP_DTYPE, count)
+        if(swap):
+            return block["texels"].astype(np.uint16)
+        return block["texels"]
@@ -3,116 +3,223 @@ import bmesh
 import mathutils
 import math
 import json
-import datetime
-import struct
 import os
-import io
+import numpy as np
 from .data_stream import *
+from .mesh_builder import create_indexed_triangle_mesh, get_used_vertices
+from .materials import MaterialCache
+from .texture_resolver import get_texture_resolver
+from .bone_animation import iter_bones, get_bone_keyframes
+from .importers.skin_reader import *
+from .import_stats import *
 
 # If this is not an empty string then it will output the object data to a json file at the given path
 DEBUG_JSON = ""
 
-def read_dma_skin(context, filepath):
+def read_dma_skin(context, filepath, stats=NULL_STATS):
     print("running read_dma_skin...")
 
-    buffered_input_stream = io.BufferedReader(io.FileIO(filepath, mode="rb"))
+    stream = open_data_file(filepath)
 
-    skin_type = read_short(buffered_input_stream)
-
-    data = {}
-
-    if(skin_type == 0):
-        print("Static skin file found, loading...")
-        data = read_static_skin(buffered_input_stream)
-    elif(skin_type == 1):
-        print("Shape skin file found, loading...")
-        data = read_shape_skin(buffered_input_stream)
-    elif(skin_type == 2):
-        print("Bone skin file found, loading...")
-        data = read_bone_skin(buffered_input_stream)
-    else:
-        print("Unknown skin file version found, aborting...")
+    with stats.stage(STAGE_SKIN, stream):
+        data = get_skin_data(stream)
+    if(data is None):
         return {'CANCELLED'}
 
     if(DEBUG_JSON != ""):
         with open(DEBUG_JSON, "w") as f:
-            json.dump(data, f, indent=4)
+            json.dump(data, f, indent=4, default=lambda value: value.tolist())
 
     if(data.get("vertex_coords") is None):
         print("No vertex coordinates found, aborting...")
         return {'CANCELLED'}
 
-    create_mesh_from_skin(data, filepath)
+    cache = MaterialCache()
+    create_mesh_from_skin(data, filepath, cache, stats)
+    cache.report()
 
     return {'FINISHED'}
 
-def create_mesh_from_skin(data, filepath):
+def create_mesh_from_skin(data, filepath, cache=None, stats=NULL_STATS):
 
-    texture_path = os.path.join(os.path.join(os.path.dirname(os.path.abspath(filepath)), os.path.pardir), os.path.pardir) + "\\texture\\"
-    has_textures = os.path.exists(texture_path)
+    with stats.stage(STAGE_TEXTURE_INDEX):
+        textures = get_texture_resolver(filepath)
+    has_textures = textures.found_folder()
     if(has_textures):
         print("Found textures folder!")
     else:
         print("Textures folder not found!")
-
-    material_count = len(data["materials"])
-    material_verts = []
-    material_faces = []
-    material_texcoords = []
-    anim_frame = 0
-    for i in range(material_count):
-        current_verts = []
-        current_faces = []
-        current_texcoords = []
-        current_frame = data["vertex_coords"][0]
-        for j in range(0, len(current_frame), 3):
-            current_verts.append([-current_frame[j], current_frame[j+2], current_frame[j+1]])
-        for j in range(len(data["face_indices"][i])):
-            current_faces.append(data["face_indices"][i][j])
-        for j in range(0, len(data["face_texcoords"][i]), 3):
-            current_texcoords.append(data["face_texcoords"][i][j])
-            current_texcoords.append(data["face_texcoords"][i][j+2])
-            current_texcoords.append(data["face_texcoords"][i][j+1])
-        material_verts.append(current_verts)
-        material_faces.append(current_faces)
-        material_texcoords.append(current_texcoords)
+    if(cache is None):
+        cache = MaterialCache()
+
+    armature_objects = []
+    shape_keys = []
+    # The vertices are swizzled once, and every material only gets the vertices its faces use
+    with stats.stage(STAGE_MESH_BUILD):
+        material_count = len(data["materials"])
+        vertices = swizzle_skin_vertices(data["vertex_coords"][0])
+        # Every frame of a shape skin becomes a shape key
+        shape_frames = None
+        if(data["skin_type"] == 1 and len(data["vertex_coords"]) > 1):
+            shape_frames = swizzle_skin_vertices(data["vertex_coords"])
     for i in range(material_count):
         material = data["materials"][i]
-        vertices = material_verts[i]
-        faces = material_faces[i]
-        texcoords = material_texcoords[i]
         mat_name = material["name"]
-        mesh = bpy.data.meshes.new(mat_name)
-        mesh.from_pydata(vertices, [], faces)
-        mesh.update()
-        object = bpy.data.objects.new(mat_name, mesh)
+        with stats.stage(STAGE_MESH_BUILD):
+            used, faces = get_used_vertices(data["face_indices"][i])
+            # Each face stores its uvs as uv1, uv2, uv3 which are reordered to uv1, uv3, uv2 like its corners
+            texcoords = data["face_texcoords"][i].reshape(-1, 3, 2)[:, [0, 2, 1]]
+            mesh = create_indexed_triangle_mesh(mat_name, vertices[used], faces, texcoords)
+            object = bpy.data.objects.new(mat_name, mesh)
         if(has_textures and material["textured"]):
             tex_name = material["texture"].split('\\')[-1].split('.')[0]
-            mat = bpy.data.materials.new(name=tex_name)
-            mat.diffuse_color = (1, 1, 1, 1)
-            mat.use_nodes = True
-            mat_principled_bsdf = mat.node_tree.nodes.get("Principled BSDF")
-            tex_node = mat.node_tree.nodes.new("ShaderNodeTexImage")
-            tex_node.image = bpy.data.images.load(texture_path + material["texture"])
-            mat.node_tree.links.new(tex_node.outputs[0], mat_principled_bsdf.inputs[0])
+            with stats.stage(STAGE_MATERIALS):
+                mat = cache.get_material(tex_name, textures.resolve(material["texture"]), False)
             object.data.materials.append(mat)
         bpy.context.collection.objects.link(object)
         object.select_set(True)
 
-        uv_layer = mesh.uv_layers.new(name="UVMap")
-        mesh.uv_layers.active = uv_layer
-        for face in mesh.polygons:
-            for vert_idx, loop_idx in zip(face.vertices, face.loop_indices):
-                uv_layer.data[loop_idx].uv = texcoords[loop_idx]
+        if(shape_frames is not None):
+            with stats.stage(STAGE_MESH_BUILD):
+                create_shape_keys(object, shape_frames[:, used])
+            shape_keys.append(mesh.shape_keys)
         
         if(data.get("skeleton") is not None):
             bpy.context.view_layer.objects.active = object
             bpy.ops.object.armature_add(enter_editmode=True, align='WORLD', location=object.matrix_world.translation, scale=(1, 1, 1))
             armature = bpy.data.armatures[-1]
+            if(bpy.context.view_layer.objects.active not in armature_objects):
+                armature_objects.append(bpy.context.view_layer.objects.active)
             create_bone_hierarchy(data["skeleton"]["bones"], None, armature)
             print(armature)
             #bpy.ops.object.mode_set(mode='EDIT', toggle=False)
             ...
+    if(len(armature_objects) > 0 and len(data["anim_sequences"]) > 0):
+        with stats.stage(STAGE_ANIMATION):
+            actions = create_bone_actions(data, data["skeleton"]["bones"])
+        if(len(actions) > 0):
+            for armature_object in armature_objects:
+                assign_action(armature_object, actions[0])
+    if(len(shape_keys) > 0 and len(data.get("animations", [])) > 0):
+        scene_fps = bpy.context.scene.render.fps / bpy.context.scene.render.fps_base
+        with stats.stage(STAGE_ANIMATION):
+            actions = create_shape_key_actions(data, len(shape_frames), scene_fps)
+        if(len(actions) > 0):
+            for key in shape_keys:
+                assign_action(key, actions[0])
+    textures.report()
+
+# Skins store their vertices as x, y, z, which are swizzled into Blender's axes as [-x, z, y]
+def swizzle_skin_vertices(vertices):
+    swizzled = vertices[..., [0, 2, 1]]
+    swizzled[..., 0] *= -1
+    return swizzled
+
+def get_shape_key_name(frame):
+    return "Frame " + str(frame)
+
+# Adds a shape key per frame on top of a basis holding the mesh as it is.
+# frames is a (frames, vertices, 3) array that's already in Blender's axes
+def create_shape_keys(object, frames):
+    object.shape_key_add(name="Basis", from_mix=False)
+    for i in range(len(frames)):
+        shape_key = object.shape_key_add(name=get_shape_key_name(i), from_mix=False)
+        shape_key.data.foreach_set("co", frames[i].ravel())
+
+# Creates an Action per animation sequence of a shape skin, which plays its frames one after the other by fading the value
+# of each frame's shape key in from the frame before and out into the frame after. The frames of a sequence are spaced
+# by its framerate, falling back to the default framerate of the skin, in frames of the scene
+def create_shape_key_actions(data, frame_count, scene_fps):
+    actions = []
+    for sequence in data["animations"]:
+        # Sequences of an unsupported version are read as empty dicts
+        if(sequence.get("name") is None):
+            continue
+        from_frame = min(sequence["from_frame"], frame_count - 1)
+        to_frame = min(sequence["to_frame"], frame_count - 1)
+        if(to_frame < from_frame):
+            continue
+        framerate = sequence["framerate"] if sequence["framerate"] > 0 else data["default_fps"]
+        step = scene_fps / framerate if framerate > 0 else 1.0
+        action = bpy.data.actions.new(data["id"] + "_" + sequence["name"])
+        action["framerate"] = framerate
+        action.use_fake_user = len(actions) > 0
+        channelbag = get_action_channelbag(action, 'KEY', "Key")
+        key_count = to_frame - from_frame + 1
+        times = np.arange(key_count, dtype=np.float32) * step
+        for position in range(key_count):
+            start = max(position - 1, 0)
+            end = min(position + 2, key_count)
+            co = np.zeros((end - start, 2), dtype=np.float32)
+            co[:, 0] = times[start:end]
+            co[position - start, 1] = 1.0
+            fcurve = new_fcurve(channelbag, 'key_blocks["' + get_shape_key_name(from_frame + position) + '"].value', 0, "Shape Keys")
+            fcurve.keyframe_points.add(len(co))
+            fcurve.keyframe_points.foreach_set("co", co.ravel())
+            fcurve.update()
+        actions.append(action)
+    print("Created " + str(len(actions)) + " actions for " + str(frame_count) + " shape keys")
+    return actions
+
+# Creates an Action per animation sequence of a bone skin, with an F-curve per channel of every animated bone.
+# Every F-curve gets all of its keyframes added at once and filled from a flat array, instead of inserting them one by one.
+# Keys are numbered from frame 0 at the start of the sequence, whose framerate is kept as a custom property of the Action
+def create_bone_actions(data, bones):
+    actions = []
+    bones = list(iter_bones(bones))
+    for sequence in data["anim_sequences"]:
+        # Sequences of an unsupported version are read as empty dicts
+        if(sequence.get("name") is None or sequence["to_frame"] < sequence["from_frame"]):
+            continue
+        action = bpy.data.actions.new(data["id"] + "_" + sequence["name"])
+        action["framerate"] = sequence["framerate"]
+        # Only the first Action is assigned, the others would be lost on saving without a fake user
+        action.use_fake_user = len(actions) > 0
+        channelbag = get_action_channelbag(action, 'OBJECT', "Armature")
+        key_count = sequence["to_frame"] - sequence["from_frame"] + 1
+        for bone in bones:
+            keyframes = get_bone_keyframes(bone, sequence["from_frame"], sequence["to_frame"])
+            if(len(keyframes) == 0):
+                continue
+            co = np.empty((key_count, 2), dtype=np.float32)
+            co[:, 0] = np.arange(key_count)
+            for channel, values in keyframes:
+                data_path = 'pose.bones["' + bone["name"] + '"].' + channel
+                for index in range(values.shape[1]):
+                    fcurve = new_fcurve(channelbag, data_path, index, bone["name"])
+                    co[:, 1] = values[:, index]
+                    fcurve.keyframe_points.add(key_count)
+                    fcurve.keyframe_points.foreach_set("co", co.ravel())
+                    fcurve.update()
+        actions.append(action)
+    print("Created " + str(len(actions)) + " actions for " + str(len(bones)) + " bones")
+    return actions
+
+# Since Blender 4.4 the F-curves of an Action are kept per slot in a channelbag of a keyframe strip,
+# before that they're on the Action itself
+def get_action_channelbag(action, id_type, slot_name):
+    if(bpy.app.version < (4, 4, 0)):
+        return action
+    slot = action.slots.new(id_type=id_type, name=slot_name)
+    strip = action.layers.new("Layer").strips.new(type='KEYFRAME')
+    return strip.channelbag(slot, ensure=True)
+
+def new_fcurve(channelbag, data_path, index, group_name):
+    if(bpy.app.version < (4, 4, 0)):
+        return channelbag.fcurves.new(data_path, index=index, action_group=group_name)
+    fcurve = channelbag.fcurves.new(data_path, index=index)
+    group = channelbag.groups.get(group_name)
+    if(group is None):
+        group = channelbag.groups.new(group_name)
+    fcurve.group = group
+    return fcurve
+
+def assign_action(datablock, action):
+    if(datablock.animation_data is None):
+        datablock.animation_data_create()
+    datablock.animation_data.action = action
+    if(bpy.app.version >= (4, 4, 0)):
+        datablock.animation_data.action_slot = action.slots[0]
 
 def create_bone_hierarchy(bones, parent, armature):
     for i in range(len(bones)):
@@ -167,327 +274,18 @@ class ImportDMA(Operator, ImportHelper):
     #     default='OPT_A',
     # )
 
-    def execute(self, context):
-        return read_dma_skin(context, self.filepath)
-
-
-
-
+    stats_path: StringProperty(
+        name="Import Stats Report",
+        description="Write the time, bytes, allocations and peak memory of every import stage to this JSON file. Recording slows the import down, leave empty to not record anything",
+        default="",
+        subtype='FILE_PATH',
+    )
 
-def read_skin_core(stream):
-    data = {}
-    data["skin_version"] = read_short(stream)
-    if(data["skin_version"] != 266 and data["skin_version"] < 263):
-        print("Unsupported SkinCore version " + str(data["skin_version"]) + ", aborting...")
-        return {}
-    else:
-        data["timestamp"] = datetime.datetime.fromtimestamp(read_long(stream) / 1000).strftime('%Y-%m-%d %H:%M:%S')
-        data["id"] = read_string(stream)
-        print("Reading skin core for " + data["id"] + "...")
-        data["cylinder_radius"] = read_short(stream)
-        if(data["cylinder_radius"] == 0):
-            data["cylinder_radius"] = 30
-        data["cylinder_height"] = read_short(stream)
-        data["box_width"] = read_short(stream)
-        data["box_height"] = read_short(stream)
-        data["box_depth"] = read_short(stream)
-        data["sphere_radius"] = read_short(stream)
-        if(read_bool(stream)):
-            data["core_scale"] = [read_float(stream), read_float(stream), read_float(stream)]
-        else:
-            data["core_scale"] = "null"
-        if(read_bool(stream)):
-            data["core_rotation"] = [read_float(stream), read_float(stream), read_float(stream)]
-        else:
-            data["core_rotation"] = "null"
-        if(read_bool(stream)):
-            data["core_translation"] = [read_float(stream), read_float(stream), read_float(stream)]
-        else:
-            data["core_translation"] = "null"
-        data["use_alpha_test"] = read_bool(stream)
-        if(data["skin_version"] > 263):
-            data["use_mirroring"] = read_bool(stream)
-        if(data["skin_version"] < 265):
-            thing = read_bool(stream)
-            data["interpolation_type"] = 1 if thing else 2
-        else:
-            data["interpolation_type"] = read_int(stream)
-        mat_count = read_short(stream)
-        data["materials"] = []
-        data["face_indices"] = []
-        data["face_texcoords"] = []
-        data["face_vertex_colors"] = []
-        for i in range(mat_count):
-            data["materials"].append(read_material(stream))
-        for i in range(mat_count):
-            new_count = read_short(stream)
-            face_inds = []
-            for j in range(0, new_count, 3):
-                pos = [read_char(stream), read_char(stream), read_char(stream)]
-                face_inds.append([pos[0], pos[2], pos[1]])
-            data["face_indices"].append(face_inds)
-        for i in range(mat_count):
-            new_count = read_short(stream)
-            face_texcoords = []
-            for j in range(0, new_count, 2):
-                face_texcoords.append([read_float(stream), read_float(stream)])
-            data["face_texcoords"].append(face_texcoords)
-        if(data["skin_version"] >= 266):
-            for i in range(mat_count):
-                new_count = read_short(stream)
-                face_vertex_colors = []
-                for j in range(0, new_count, 3):
-                    pos = [read_float(stream), read_float(stream), read_float(stream)]
-                    face_vertex_colors.append([pos[0], pos[1], pos[2]])
-                data["face_vertex_colors"].append(face_vertex_colors)
-        else:
-            for i in range(mat_count):
-                new_count = read_short(stream)
-                face_vertex_colors = []
-                for j in range(new_count):
-                    face_vertex_colors.append(1.0)
-        contact_point_count = read_short(stream)
-        data["contact_points"] = []
-        if(contact_point_count > 0):
-            data["contact_points"].append(read_contact_point(stream))
-        if(read_bool(stream)):
-            data["lod"] = read_lod(stream)
-
-
-    return data
-
-def read_static_skin(stream):
-    data = read_skin_core(stream)
-    data["skin_type"] = 0
-    data["static_version"] = read_short(stream)
-    if(data["static_version"] != 258):
-        print("Unsupported Static Skin version " + str(data["static_version"]) + ", aborting...")
-        return {}
-    else:
-        print("Reading Static Skin version " + str(data["static_version"]) + "...")
-        vertex_coord_count = read_short(stream)
-        data["vertex_coords"] = [[]]
-        for i in range(vertex_coord_count):
-            data["vertex_coords"][0].append(read_float(stream))
-    return data
-
-def read_shape_skin(stream):
-    data = read_skin_core(stream)
-    data["skin_type"] = 1
-    data["shape_version"] = read_short(stream)
-    if(data["shape_version"] != 258):
-        print("Unsupported Shape Skin version " + str(data["shape_version"]) + ", aborting...")
-        return data
-    else:
-        print("Reading Shape Skin version " + str(data["shape_version"]) + "...")
-        vertex_coord_count = read_short(stream)
-        data["vertex_coords"] = []
-        for i in range(vertex_coord_count):
-            c = read_short(stream)
-            coords = []
-            if(c > 0):
-                for j in range(c):
-                    coords.append(read_float(stream))
-                data["vertex_coords"].append(coords)
-        data["default_fps"] = read_short(stream)
-        animation_count = read_short(stream)
-        if(animation_count > 0):
-            data["animations"] = []
-            for i in range(animation_count):
-                data["animations"].append(read_animation(stream))
-    return data
-
-def read_bone_skin(stream):
-    data = read_skin_core(stream)
-    data["skin_type"] = 2
-    data["bone_version"] = read_short(stream)
-    if(data["bone_version"] != 1):
-        print("Unsupported Bone Skin version " + str(data["bone_version"]) + ", aborting...")
-        return data
-    else:
-        print("Reading Bone Skin version " + str(data["bone_version"]) + "...")
-        vertex_coord_count = read_int(stream)
-        data["vertex_coords"] = [[]]
-        for i in range(vertex_coord_count):
-            data["vertex_coords"][0].append(read_float(stream))
-        data["skeleton"] = read_skeleton(stream)
-        data["default_fps"] = read_short(stream)
-        anim_sequence_count = read_short(stream)
-        data["anim_sequences"] = []
-        if(anim_sequence_count > 0):
-            for i in range(anim_sequence_count):
-                data["anim_sequences"].append(read_animation(stream))
-    return data
-
-def read_material(stream):
-    material = {}
-    material["material_version"] = read_short(stream)
-    if(material["material_version"] != 257):
-        print("Unsupported Material version " + str(material["material_version"]) + ", aborting...")
-        return material
-    else:
-        material["name"] = read_string(stream)
-        print("Reading Material " + material["name"] + "...")
-        material["transparent"] = read_bool(stream)
-        material["textured"] = read_bool(stream)
-        if(material["textured"]):
-            material["texture"] = read_string(stream)
-    return material
-
-def read_contact_point(stream):
-    point = {}
-    point["point_version"] = read_short(stream)
-    if(point["point_version"] == 257):
-        point["name"] = read_string(stream)
-        print("Reading Contact Point " + point["name"] + "...")
-        point["vertices"] = [read_short(stream), read_short(stream), read_short(stream)]
-        if(read_bool(stream)):
-            point["core_translation"] = [read_float(stream), read_float(stream), read_float(stream)]
-        else:
-            point["core_translation"] = "null"
-        if(read_bool(stream)):
-            point["core_rotation"] = [read_float(stream), read_float(stream), read_float(stream)]
-        else:
-            point["core_rotation"] = "null"
-        point["sphere_radius"] = read_float(stream)
-        anim_count = read_short(stream)
-        point["has_animation"] = []
-        point["animations"] = []
-        point["rotations"] = []
-        for i in range(anim_count):
-            has_anim = read_bool(stream)
-            point["has_animation"].append(has_anim)
-            if(has_anim):
-                point["animations"].append([read_float(stream), read_float(stream), read_float(stream)])
-                point["rotations"].append([read_float(stream), read_float(stream), read_float(stream)])
-    return point
-
-def read_lod(stream):
-    lod = {}
-    lod["lod_version"] = read_short(stream)
-    if(lod["lod_version"] != 258 and lod["lod_version"] != 257):
-        print("Unsupported LOD version " + str(lod["lod_version"]) + ", aborting...")
-        return {}
-    else:
-        print("Reading LOD with version " + str(lod["lod_version"]) + "...")
-        lod["start_distance"] = read_float(stream)
-        lod["end_distance"] = read_float(stream)
-        lod["end_level"] = read_short(stream)
-        lod["start_level"] = read_short(stream)
-        if(lod["lod_version"] > 257):
-            lod["frame_used"] = read_short(stream)
-        texcoord_count = read_short(stream)
-        for i in range(texcoord_count):
-            lod["face_texcoords"].append(read_float(stream))
-        face_vert_count = read_char(stream)
-        for i in range(face_vert_count):
-            inner_count = read_char(stream)
-            thing = []
-            for j in range(inner_count):
-                thing.append(read_char(stream))
-            lod["face_indices"].append(thing)
-        face_ind_count = read_short(stream)
-        for i in range(face_ind_count):
-            inner_count = read_short(stream)
-            thing = []
-            for j in range(inner_count):
-                thing.append(read_short(stream))
-            lod["face_indices"].append(thing)
-        lod_level_count = read_short(stream)
-        for i in range(lod_level_count):
-            lod["lod_levels"].append(read_lod_level(stream, i))
-    return lod
-
-def read_lod_level(stream, num):
-    level = {}
-    level["lod_level_version"] = read_short(stream)
-    if(level["lod_level_version"] != 257):
-        print("Unsupported LODLevel version " + str(level["lod_level_version"]) + ", aborting...")
-        return {}
-    else:
-        print("Reading LODLevel with version " + str(level["lod_level_version"]) + "...")
-        level["level"] = num
-        count = read_short(stream)
-        if(count != 0):
-            level["levels"] = []
-            for i in range(count):
-                lvl = {}
-                lvl["a"] = read_byte(stream)
-                lvl["b"] = read_short(stream)
-                lvl["c"] = read_short(stream)
-                if(lvl["a"] & 1 != 0):
-                    lvl["aa"] = read_short(stream)
-                    lvl["bb"] = [read_float(stream), read_float(stream)]
-                if(lvl["a"] & 2 != 0):
-                    lvl["aa"] = read_short(stream)
-                    lvl["cc"] = read_char(stream)
-                level["levels"].append(lvl)
-    return level
-
-def read_animation(stream):
-    anim = {}
-    anim["animation_version"] = read_short(stream)
-    if(anim["animation_version"] != 258):
-        print("Unsupported AnimationSequence version " + str(anim["animation_version"]) + ", aborting...")
-        return {}
-    else:
-        anim["name"] = read_string(stream)
-        anim["description"] = read_string(stream)
-        print("Reading AnimationSequence " + anim["name"] + " (" + anim["description"] + ")...")
-        anim["from_frame"] = read_short(stream)
-        anim["to_frame"] = read_short(stream)
-        anim["front_speed"] = read_float(stream)
-        anim["side_speed"] = read_float(stream)
-        anim["eye_level"] = read_short(stream)
-        anim["camera_level"] = read_short(stream)
-        anim["framerate"] = read_short(stream)
-    return anim
-
-def read_skeleton(stream):
-    skeleton = {}
-    bone_count = read_short(stream)
-    print("Reading skeleton with " + str(bone_count) + " bones...")
-    skeleton["bones"] = []
-    for i in range(bone_count):
-        skeleton["bones"].append(read_bone(stream))
-    return skeleton
-
-def read_bone(stream):
-    bone = {}
-    bone["id"] = read_int(stream)
-    print("Reading bone " + str(bone["id"]) + "...")
-    bone["name"] = read_string(stream)
-    bone_weight_count = read_short(stream)
-    bone["weights"] = []
-    for i in range(bone_weight_count):
-        bone["weights"].append(read_float(stream))
-    vert_count = read_short(stream)
-    bone["vertices"] = []
-    for i in range(vert_count):
-        bone["vertices"].append(read_int(stream))
-    bone["scale"] = [read_float(stream), read_float(stream), read_float(stream)]
-    bone["rotation"] = [read_float(stream), read_float(stream), read_float(stream), read_float(stream)]
-    bone["translation"] = [read_float(stream), read_float(stream), read_float(stream)]
-    child_count = read_short(stream)
-    bone["children"] = []
-    for i in range(child_count):
-        bone["children"].append(read_bone(stream))
-    bone["animation"] = read_bone_animation(stream)
-    return bone
-
-def read_bone_animation(stream):
-    bone_anim = {}
-    print("Reading bone animation...")
-    scale_count = read_short(stream)
-    bone_anim["scales"] = []
-    for i in range(scale_count):
-        bone_anim["scales"].append([read_float(stream), read_float(stream), read_float(stream)])
-    rotation_count = read_short(stream)
-    bone_anim["rotations"] = []
-    for i in range(rotation_count):
-        bone_anim["rotations"].append([read_float(stream), read_float(stream), read_float(stream), read_float(stream)])
-    translation_count = read_short(stream)
-    bone_anim["translations"] = []
-    for i in range(translation_count):
-        bone_anim["translations"].append([read_float(stream), read_float(stream), read_float(stream)])
-    return bone_anim
\ No newline at end of file
+    def execute(self, context):
+        stats = ImportStats(track_memory=True) if self.stats_path != "" else NULL_STATS
+        result = read_dma_skin(context, self.filepath, stats)
+        if(stats.enabled):
+            stats.stop()
+            stats.report()
+            stats.write_json(bpy.path.abspath(self.stats_path))
+        return result
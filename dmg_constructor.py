@@ -1,21 +1,35 @@
 import bpy
 import bmesh
 import datetime
-import gzip
 import os
-from io import BufferedReader
+import numpy as np
 from .data_stream import *
+from .mesh_builder import create_triangle_mesh, create_point_mesh, VertexWelder
+from .texture_groups import *
+from .materials import MaterialCache, SESSION_CACHE
+from .texture_resolver import get_texture_resolver
 from .importers.kvs.dmg_importer_versusville import ImporterVersusvilleDMG
 from .importers.alias.dmg_importer_alias import ImporterAliasDMG
+from .importers.cell_cache import CellCache
+from .importers.raw_cell import RawCellStore
+from .importers.cell_loader import ALL_SECTIONS, iter_in_background
+from .importers.waypoint_reader import get_waypoint_edges
+from .import_stats import *
 
-def read_dmg_locale(context, filepath):
+# How many prepared cells a pipelined import keeps ready ahead of the cell whose meshes are being built
+PIPELINE_DEPTH = 2
+
+# The waypoint fields that are stored as vertex attributes on the waypoint object, when the locale version has them
+WAYPOINT_ATTRIBUTES = ["cell_id", "sequence", "group_id", "leading_id", "trailing_id", "racing_offset", "overtaking_offset", "type_flags"]
+
+def read_dmg_locale(context, filepath, parallel=False, import_mode='TEXTURE', use_session_cache=False, cell_cache=None, sections=ALL_SECTIONS, stats=NULL_STATS, import_waypoints=True, pipeline=False, weld_distance=0.0, raw_cells=None):
     print("running read_dmg_locale...")
 
-    file_input_stream = open(filepath, "rb")
-    gzip_input_stream = gzip.GzipFile(fileobj=file_input_stream, mode='rb')
-    buffered_input_stream = BufferedReader(gzip_input_stream)
+    with stats.stage(STAGE_DECOMPRESS) as stage:
+        stream = open_gzip_data_file(filepath)
+        stage.add_bytes(os.path.getsize(filepath))
 
-    data_version = read_short(buffered_input_stream)
+    data_version = stream.read_short()
 
     data = {}
 
@@ -25,164 +39,136 @@ def read_dmg_locale(context, filepath):
         if(data_version <= 1296):
             # Alias Cell File
             print("Using Alias Cell File Importer...")
-            data = ImporterAliasDMG.get_map_data_from_cell(buffered_input_stream, data_version)
+            data = ImporterAliasDMG.get_map_data_from_cell(stream, data_version, sections=sections, stats=stats)
         else:
             # Versusville/Minigolf Cell File
             print("Using Versusville Cell File Importer...")
-            data = ImporterVersusvilleDMG.get_map_data_from_cell(buffered_input_stream, data_version)
+            data = ImporterVersusvilleDMG.get_map_data_from_cell(stream, data_version, sections=sections, stats=stats)
+        with stats.stage(STAGE_PREPARE):
+            data["cells"] = [prepare_cell_groups(cell) for cell in data["cells"]]
     else:
         # Map File
         print("Map file version " + str(data_version) + " found...")
         if(data_version <= 791):
             # Alias Map File
             print("Using Alias Map File Importer...")
-            data = ImporterAliasDMG.get_map_data(buffered_input_stream, data_version, filepath)
+            data = ImporterAliasDMG.iter_map_data(stream, data_version, filepath, parallel=parallel, cell_cache=cell_cache, sections=sections, stats=stats, prepare_cell=prepare_cell_groups, raw_cells=raw_cells)
         else:
             # Versusville/Minigolf Map File
             print("Using Versusville Map File Importer...")
-            data = ImporterVersusvilleDMG.get_map_data(buffered_input_stream, data_version, filepath)
+            data = ImporterVersusvilleDMG.iter_map_data(stream, data_version, filepath, parallel=parallel, cell_cache=cell_cache, sections=sections, stats=stats, prepare_cell=prepare_cell_groups, raw_cells=raw_cells)
 
-    create_mesh_from_map(data, filepath)
+    cache = SESSION_CACHE if use_session_cache else MaterialCache()
+    create_mesh_from_map(data, filepath, import_mode, cache, stats, import_waypoints, pipeline, weld_distance)
+    cache.report()
 
     return {'FINISHED'}
 
-def create_mesh_from_map(data, filepath):
-    
+# The cells in data["cells"] are prepared by prepare_cell_groups. With pipeline=True the next cells are loaded on
+# a background thread, and their textures read ahead, while the meshes of the current cell are built.
+# With a weld_distance above 0 the vertices of every mesh that are within that distance of each other are merged
+def create_mesh_from_map(data, filepath, import_mode='TEXTURE', cache=None, stats=NULL_STATS, import_waypoints=True, pipeline=False, weld_distance=0.0):
+
+    # Get the textures
+    with stats.stage(STAGE_TEXTURE_INDEX):
+        textures = get_texture_resolver(filepath)
+    has_textures = textures.found_folder()
+    if(has_textures):
+        print("Found textures folder!")
+    else:
+        print("Textures folder not found!")
+    if(cache is None):
+        cache = MaterialCache()
+
+    welder = VertexWelder(weld_distance) if weld_distance > 0 else None
+
     cells = data["cells"]
+    if(pipeline):
+        cells = iter_in_background(cells, PIPELINE_DEPTH, lambda cell: prefetch_textures(cell, textures))
 
+    locale_groups = []
     for cell in cells:
-
-        vertices = cell["vertex"]
-        texcoord = cell["texcoord"]
-
-        # Get the faces
-        faces = []
-        face_verts = []
-        face_texcoords = []
-        current_face = 0
-        for j in range(len(cell["texture_list"])):
-            faces.append([])
-            face_verts.append([])
-            face_texcoords.append([])
-        j = 0
-        count = 0
-        for k in range(0, len(vertices), 3):
-            if(current_face < len(cell["texture_list"])-1 and j == cell["face_start"][current_face + 1]):
-                current_face += 1
-                count = 0
-            faces[current_face].append([count+0, count+1, count+2])
-            face_verts[current_face].append(vertices[k+0])
-            face_verts[current_face].append(vertices[k+1])
-            face_verts[current_face].append(vertices[k+2])
-            for l in [0, 2, 1]:
-                if(k+l < len(texcoord)):
-                    face_texcoords[current_face].append(texcoord[k+l])
-                else:
-                    face_texcoords[current_face].append([0, 0])
-            count += 3
-            j += 1
-
-        # Get the textures
-        texture_path = os.path.join(os.path.join(os.path.dirname(os.path.abspath(filepath)), os.path.pardir), os.path.pardir) + "\\texture\\"
-        has_textures = os.path.exists(texture_path)
-        if(has_textures):
-            print("Found textures folder!")
+        groups = cell["groups"]
+        if(import_mode == 'CELL'):
+            create_merged_object(cell["name"], groups, textures if has_textures else None, cache, stats, welder)
+        elif(import_mode == 'LOCALE'):
+            locale_groups.extend(groups)
         else:
-            print("Textures folder not found!")
-
-        for i in range(0, len(cell["texture_list"])):
-            tex_name = cell["texture_list"][i].split('\\')[-1].split('.')[0]
-            mesh = bpy.data.meshes.new(tex_name)
-            mesh.from_pydata(face_verts[i], [], faces[i])
-            mesh.update()
-            object = bpy.data.objects.new(tex_name, mesh)
-            if(has_textures):
-                material = bpy.data.materials.new(name=tex_name)
-                material.diffuse_color = (1, 1, 1, 1)
-                material.use_nodes = True
-                mat_principled_bsdf = material.node_tree.nodes.get("Principled BSDF")
-                tex_node = material.node_tree.nodes.new("ShaderNodeTexImage")
-                tex_node.image = bpy.data.images.load(texture_path + cell["texture_list"][i])
-                material.node_tree.links.new(tex_node.outputs[0], mat_principled_bsdf.inputs[0])
-                object.data.materials.append(material)
-            bpy.context.collection.objects.link(object)
-            object.select_set(True)
-            object.scale = (0.01, 0.01, 0.01)
-            uv_layer = mesh.uv_layers.new(name="UVMap")
-            mesh.uv_layers.active = uv_layer
-            for face in mesh.polygons:
-                for vert_idx, loop_idx in zip(face.vertices, face.loop_indices):
-                    uv_layer.data[loop_idx].uv = face_texcoords[i][loop_idx]
-        
-
-        alpha_vertices = cell["alpha_vertex"]
-        alpha_texcoord = cell["alpha_texcoord"]
-
-        # Get the faces
-        alpha_faces = []
-        alpha_face_verts = []
-        alpha_face_texcoords = []
-        alpha_current_face = 0
-        for j in range(len(cell["alpha_texture_list"])):
-            alpha_faces.append([])
-            alpha_face_verts.append([])
-            alpha_face_texcoords.append([])
-        j = 0
-        count = 0
-        nextStart = 0
-        if(len(cell["alpha_texture_list"]) >= 1):
-            nextStart = cell["alpha_face_count"][0]
-        for k in range(0, len(alpha_vertices), 3):
-            if(j == nextStart):
-                alpha_current_face += 1
-                if(alpha_current_face >= len(cell["alpha_texture_list"])-1):
-                    nextStart += 9999999
-                else:
-                    nextStart += cell["alpha_face_count"][alpha_current_face + 1]
-                count = 0
-            alpha_faces[alpha_current_face].append([count, count+1, count+2])
-            alpha_face_verts[alpha_current_face].append(alpha_vertices[k])
-            alpha_face_verts[alpha_current_face].append(alpha_vertices[k+1])
-            alpha_face_verts[alpha_current_face].append(alpha_vertices[k+2])
-            for l in range(0, 3):
-                if(k+l < len(alpha_texcoord)):
-                    alpha_face_texcoords[alpha_current_face].append(alpha_texcoord[k+l])
-                else:
-                    alpha_face_texcoords[alpha_current_face].append([0, 0])
-            count += 3
-            j += 1
-
-        for i in range(0, len(cell["alpha_texture_list"])):
-            tex_name = cell["alpha_texture_list"][i].split('\\')[-1].split('.')[0]
-            mesh = bpy.data.meshes.new(tex_name)
-            mesh.from_pydata(alpha_face_verts[i], [], alpha_faces[i])
-            mesh.update()
-            object = bpy.data.objects.new(tex_name, mesh)
-            if(has_textures):
-                material = bpy.data.materials.new(name=tex_name)
-                material.diffuse_color = (1, 1, 1, 1)
-                material.blend_method = 'CLIP'
-                material.shadow_method = 'CLIP'
-                material.use_nodes = True
-                mat_principled_bsdf = material.node_tree.nodes.get("Principled BSDF")
-                tex_node = material.node_tree.nodes.new("ShaderNodeTexImage")
-                tex_node.image = bpy.data.images.load(texture_path + cell["alpha_texture_list"][i])
-                material.node_tree.links.new(tex_node.outputs[0], mat_principled_bsdf.inputs[0])
-                material.node_tree.links.new(tex_node.outputs["Alpha"], mat_principled_bsdf.inputs["Alpha"])
-                object.data.materials.append(material)
-            bpy.context.collection.objects.link(object)
-            object.select_set(True)
-            object.scale = (0.01, 0.01, 0.01)
-            uv_layer = mesh.uv_layers.new(name="UVMap")
-            mesh.uv_layers.active = uv_layer
-            for face in mesh.polygons:
-                for vert_idx, loop_idx in zip(face.vertices, face.loop_indices):
-                    uv_layer.data[loop_idx].uv = alpha_face_texcoords[i][loop_idx]
+            for group in groups:
+                with stats.stage(STAGE_MESH_BUILD):
+                    mesh = create_triangle_mesh(group["name"], group["vertex"], group["texcoord"], welder=welder)
+                    object = bpy.data.objects.new(group["name"], mesh)
+                if(has_textures):
+                    with stats.stage(STAGE_MATERIALS):
+                        material = cache.get_material(group["name"], textures.resolve(group["texture"]), group["alpha"])
+                    object.data.materials.append(material)
+                bpy.context.collection.objects.link(object)
+                object.select_set(True)
+                object.scale = (0.01, 0.01, 0.01)
+        # Cells can be streamed in one at a time, so let go of this one before the next is loaded
+        del cell, groups
+    if(import_mode == 'LOCALE'):
+        create_merged_object(data["world_name"], locale_groups, textures if has_textures else None, cache, stats, welder)
+    if(import_waypoints and "waypoints" in data and len(data["waypoints"]) > 0):
+        create_waypoint_object(data["world_name"] + "_waypoints", data["waypoints"], stats)
+    textures.report()
+    if(welder is not None):
+        welder.report()
+
+def prefetch_textures(cell, textures):
+    textures.prefetch([group["texture"] for group in cell["groups"]])
+
+# Builds a single object out of several texture groups, with one material slot per texture.
+# The materials are still created without a texture folder, when textures is None, so the faces keep their texture split
+def create_merged_object(name, groups, textures, cache, stats=NULL_STATS, welder=None):
+    materials = []
+    slots = {}
+    material_indices = []
+    with stats.stage(STAGE_MATERIALS):
+        for group in groups:
+            image_path = None if textures is None else textures.resolve(group["texture"])
+            material = cache.get_material(group["name"], image_path, group["alpha"])
+            if(material not in slots):
+                slots[material] = len(materials)
+                materials.append(material)
+            material_indices.append(np.full(len(group["vertex"]) // 3, slots[material], dtype=np.int32))
+
+    with stats.stage(STAGE_MESH_BUILD):
+        vertices = np.concatenate([group["vertex"] for group in groups] + [np.empty((0, 3), dtype=np.float32)])
+        texcoords = np.concatenate([group["texcoord"] for group in groups] + [np.empty((0, 2), dtype=np.float32)])
+        mesh = create_triangle_mesh(name, vertices, texcoords, np.concatenate(material_indices + [np.empty(0, dtype=np.int32)]), welder)
+    for material in materials:
+        mesh.materials.append(material)
+    object = bpy.data.objects.new(name, mesh)
+    bpy.context.collection.objects.link(object)
+    object.select_set(True)
+    object.scale = (0.01, 0.01, 0.01)
+    return object
+
+# Builds a single object holding every waypoint as a vertex and every link between them as an edge.
+# The waypoint fields are stored as attributes on the vertices
+def create_waypoint_object(name, waypoints, stats=NULL_STATS):
+    with stats.stage(STAGE_MESH_BUILD):
+        position = waypoints["position"]
+        vertices = np.empty(position.shape, dtype=np.float32)
+        vertices[:, 0] = -position[:, 0]
+        vertices[:, 1] = position[:, 2]
+        vertices[:, 2] = position[:, 1]
+        attributes = {}
+        for attribute_name in WAYPOINT_ATTRIBUTES:
+            if(attribute_name in waypoints):
+                attributes[attribute_name] = waypoints[attribute_name]
+        mesh = create_point_mesh(name, vertices, get_waypoint_edges(waypoints), attributes)
+    object = bpy.data.objects.new(name, mesh)
+    bpy.context.collection.objects.link(object)
+    object.select_set(True)
+    object.scale = (0.01, 0.01, 0.01)
+    return object
 
 # ImportHelper is a helper class, defines filename and
 # invoke() function which calls the file selector.
 from bpy_extras.io_utils import ImportHelper
-from bpy.props import StringProperty, BoolProperty, EnumProperty
+from bpy.props import StringProperty, BoolProperty, EnumProperty, IntProperty, FloatProperty
 from bpy.types import Operator
 
 
@@ -218,5 +204,99 @@ class ImportDMG(Operator, ImportHelper):
     #     default='OPT_A',
     # )
 
+    use_parallel: BoolProperty(
+        name="Parallel Cell Loading",
+        description="Decompress and parse the cells of a locale in worker processes, one per CPU core",
+        default=False,
+    )
+
+    import_mode: EnumProperty(
+        name="Objects",
+        description="How the imported geometry is split into objects",
+        items=(
+            ('TEXTURE', "One Per Texture", "Create a separate object for every texture of every cell"),
+            ('CELL', "One Per Cell", "Create one object per cell, with a material slot per texture"),
+            ('LOCALE', "One Per Locale", "Create a single object for the whole locale, with a material slot per texture"),
+        ),
+        default='TEXTURE',
+    )
+
+    use_session_cache: BoolProperty(
+        name="Reuse Materials Across Imports",
+        description="Keep reusing the materials and images created by earlier imports in this session",
+        default=False,
+    )
+
+    use_cell_cache: BoolProperty(
+        name="Cache Parsed Cells",
+        description="Keep parsed cells on disk so re-importing an unchanged locale skips decompressing and parsing them",
+        default=False,
+    )
+
+    use_raw_cells: BoolProperty(
+        name="Keep Decompressed Cells",
+        description="Write a decompressed copy of every cell next to it, with a table of contents of its sections, and map it into memory on later imports instead of decompressing the cell again",
+        default=False,
+    )
+
+    cell_cache_size: IntProperty(
+        name="Cell Cache Size (MB)",
+        description="Least recently used cells are removed from the cache once it grows past this size",
+        default=2048,
+        min=1,
+    )
+
+    sections: EnumProperty(
+        name="Decode Sections",
+        description="Sections of every cell to decode. Only the geometry is needed to build the meshes, the rest is skipped over",
+        items=(
+            ('lightmaps', "Lightmaps", "Decode the lightmaps and their texcoords"),
+            ('bsp', "BSP Trees", "Decode the BSP and QBTree collision trees"),
+            ('portal_vis', "Portal Vis Trees", "Decode the portal visibility trees"),
+            ('light_tree', "Light Trees", "Decode the light trees"),
+        ),
+        options={'ENUM_FLAG'},
+        default=set(),
+    )
+
+    import_waypoints: BoolProperty(
+        name="Import Waypoints",
+        description="Create an object holding the waypoints of the locale as vertices, with the links between them as edges",
+        default=True,
+    )
+
+    use_pipeline: BoolProperty(
+        name="Overlap Loading And Building",
+        description="Load the next cells on a background thread while the meshes of the current cell are built, and read their textures ahead",
+        default=True,
+    )
+
+    use_weld: BoolProperty(
+        name="Merge Vertices",
+        description="Merge the vertices of every mesh that are within the weld distance of each other, instead of giving every triangle its own three vertices",
+        default=False,
+    )
+
+    weld_distance: FloatProperty(
+        name="Weld Distance",
+        description="Vertices closer than this, in locale units, are merged",
+        default=0.01,
+        min=0.0,
+    )
+
+    stats_path: StringProperty(
+        name="Import Stats Report",
+        description="Write the time, bytes, allocations and peak memory of every import stage to this JSON file. Recording slows the import down, leave empty to not record anything",
+        default="",
+        subtype='FILE_PATH',
+    )
+
     def execute(self, context):
-        return read_dmg_locale(context, self.filepath)
+        cell_cache = CellCache(size_limit=self.cell_cache_size << 20) if self.use_cell_cache else None
+        stats = ImportStats(track_memory=True) if self.stats_path != "" else NULL_STATS
+        result = read_dmg_locale(context, self.filepath, self.use_parallel, self.import_mode, self.use_session_cache, cell_cache, frozenset(self.sections), stats, self.import_waypoints, self.use_pipeline, self.weld_distance if self.use_weld else 0.0, RawCellStore() if self.use_raw_cells else None)
+        if(stats.enabled):
+            stats.stop()
+            stats.report()
+            stats.write_json(bpy.path.abspath(self.stats_path))
+        return result
@@ -0,0 +1,158 @@
+import json
+import sys
+import threading
+import time
+import tracemalloc
+
+# The stages an import is split into. Stages are never nested, but with a pipelined import the stages
+# of the cell that is being parsed run on another thread at the same time as the stages of the cell being built
+STAGE_DECOMPRESS = "decompress"
+STAGE_TEXTURE_INDEX = "texture_index"
+STAGE_CELL_CACHE = "cell_cache"
+STAGE_RAW_CELL = "raw_cell"
+STAGE_HEADER = "header"
+STAGE_GEOMETRY = "geometry"
+STAGE_BSP = "bsp"
+STAGE_PORTALS = "portals"
+STAGE_LIGHT_TREE = "light_tree"
+STAGE_LIGHTMAPS = "lightmaps"
+STAGE_PREPARE = "prepare"
+STAGE_SKIN = "skin"
+STAGE_ANIMATION = "animation"
+STAGE_MESH_BUILD = "mesh_build"
+STAGE_MATERIALS = "materials"
+
+class ImportStats():
+    """Records the wall time, bytes consumed, objects allocated and peak memory of every stage of an import.
+
+    Each stage is timed with a with statement around it, and repeated stages (one per cell, texture, ...) are summed.
+    Objects allocated is the change in the number of memory blocks held by Python, so objects that are
+    created and freed within a stage don't count. Peak memory is only tracked with track_memory=True,
+    since tracemalloc slows everything down considerably. Objects and peak memory are counted for the whole process,
+    so they're only approximate for stages that overlap with stages on another thread.
+    """
+
+    enabled = True
+
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory
+        self.stages = {}
+        self.started_tracing = False
+        self.lock = threading.Lock()
+
+    def stage(self, name, stream=None):
+        if(self.track_memory and tracemalloc.is_tracing() == False):
+            tracemalloc.start()
+            self.started_tracing = True
+        return StageTimer(self, name, stream)
+
+    def add(self, name, seconds, byte_count, objects, peak_memory, count=1):
+        with self.lock:
+            record = self.stages.get(name)
+            if(record is None):
+                record = {"count": 0, "seconds": 0.0, "bytes": 0, "objects": 0, "peak_memory": 0}
+                self.stages[name] = record
+            record["count"] += count
+            record["seconds"] += seconds
+            record["bytes"] += byte_count
+            record["objects"] += objects
+            record["peak_memory"] = max(record["peak_memory"], peak_memory)
+
+    # Adds up the stages recorded by another ImportStats, e.g. one that was filled in by a worker process
+    def merge(self, other):
+        for name in other.stages:
+            record = other.stages[name]
+            self.add(name, record["seconds"], record["bytes"], record["objects"], record["peak_memory"], record["count"])
+
+    def stop(self):
+        if(self.started_tracing):
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def to_dict(self):
+        return {
+            "seconds": sum(record["seconds"] for record in self.stages.values()),
+            "track_memory": self.track_memory,
+            "stages": self.stages,
+        }
+
+    def write_json(self, filepath):
+        with open(filepath, "w") as f:
+            json.dump(self.to_dict(), f, indent=4)
+
+    def report(self):
+        print("%-12s %8s %10s %12s %10s %12s" % ("Stage", "Count", "Time (ms)", "Bytes", "Objects", "Peak (KB)"))
+        for name in self.stages:
+            record = self.stages[name]
+            peak = "%.1f" % (record["peak_memory"] / 1024) if self.track_memory else "n/a"
+            print("%-12s %8d %10.2f %12d %10d %12s" % (name, record["count"], record["seconds"] * 1000, record["bytes"], record["objects"], peak))
+
+    # Worker processes send their stats back to the main process, which can't pickle the tracing state or the lock
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["started_tracing"] = False
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+class StageTimer():
+    def __init__(self, stats, name, stream):
+        self.stats = stats
+        self.name = name
+        self.stream = stream
+        self.bytes = 0
+
+    def add_bytes(self, byte_count):
+        self.bytes += byte_count
+
+    def __enter__(self):
+        if(self.stats.track_memory):
+            if(hasattr(tracemalloc, "reset_peak")):
+                tracemalloc.reset_peak()
+            self.start_memory = tracemalloc.get_traced_memory()[0]
+        self.start_offset = self.stream.offset if self.stream is not None else 0
+        self.start_blocks = sys.getallocatedblocks()
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        seconds = time.perf_counter() - self.start_time
+        objects = sys.getallocatedblocks() - self.start_blocks
+        if(self.stream is not None):
+            self.bytes += self.stream.offset - self.start_offset
+        peak_memory = 0
+        if(self.stats.track_memory):
+            peak_memory = max(tracemalloc.get_traced_memory()[1] - self.start_memory, 0)
+        self.stats.add(self.name, seconds, self.bytes, objects, peak_memory)
+        return False
+
+class NullStats():
+    """Stands in for ImportStats when nothing is being recorded, every stage is the same do-nothing object."""
+
+    enabled = False
+    track_memory = False
+
+    def stage(self, name, stream=None):
+        return NULL_STAGE
+
+    def merge(self, other):
+        pass
+
+    def stop(self):
+        pass
+
+class NullStage():
+    def add_bytes(self, byte_count):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+NULL_STAGE = NullStage()
+NULL_STATS = NullStats()
@@ -1,270 +1,263 @@
 import datetime
-import gzip
-import os
-from io import BufferedReader
 from ...data_stream import *
+from ...import_stats import *
+from ..tree_reader import read_bsp_nodes, read_portal_vis_nodes, read_light_tree_nodes
+from ..cell_loader import iter_cells, ALL_SECTIONS, SECTION_LIGHTMAPS, SECTION_BSP, SECTION_PORTAL_VIS, SECTION_LIGHT_TREE
 
 class ImporterAliasDMG():
-    def get_map_data(stream, version, filepath):
+    def get_map_data(stream, version, filepath, swap_lightmaps=True, parallel=False, cell_cache=None, sections=ALL_SECTIONS, stats=NULL_STATS, raw_cells=None):
+        data = ImporterAliasDMG.iter_map_data(stream, version, filepath, swap_lightmaps, parallel, cell_cache, sections, stats, raw_cells=raw_cells)
+        data["cells"] = list(data["cells"])
+        return data
+
+    # Parses the map header straight away, but data["cells"] is a generator that only loads each cell when it's reached
+    def iter_map_data(stream, version, filepath, swap_lightmaps=True, parallel=False, cell_cache=None, sections=ALL_SECTIONS, stats=NULL_STATS, prepare_cell=None, raw_cells=None):
+        with stats.stage(STAGE_HEADER, stream):
+            data = ImporterAliasDMG.get_map_header(stream, version)
+        data["cells"] = iter_cells(filepath, data["cell_list_size"], ImporterAliasDMG.get_cell_data, swap_lightmaps, parallel, cell_cache, sections, stats, prepare_cell, raw_cells)
+        return data
+
+    def get_map_header(stream, version):
         data = {}
         data["locale_data_version"] = version
-        data["locale_id"] = read_int(stream)
-        data["world_name"] = read_string(stream)
+        data["locale_id"] = stream.read_int()
+        data["world_name"] = stream.read_string()
         data["game_name"] = "alias"
-        data["creation_date"] = datetime.datetime.fromtimestamp(read_long(stream) / 1000).strftime('%Y-%m-%d %H:%M:%S')
-        data["cell_list_size"] = read_int(stream)
-        data["center_point"] = [read_int(stream), read_int(stream), read_int(stream)]
-        data["width"] = read_int(stream)
-        data["height"] = read_int(stream)
-        data["depth"] = read_int(stream)
-        if(read_bool(stream)):
-            data["background_music"] = read_string(stream)
-        if(read_bool(stream)):
-            data["channel_name"] = read_string(stream)
-        if(read_bool(stream)):
-            data["ban_mask"] = read_string(stream)
-        if(read_bool(stream)):
-            data["channel_topic"] = read_string(stream)
-        data["max_irc_users"] = read_int(stream)
-        data["is_private_channel"] = read_bool(stream)
-        data["is_secret_channel"] = read_bool(stream)
-        data["is_invite_only_channel"] = read_bool(stream)
-        data["is_quiet_channel"] = read_bool(stream)
-        world_entries_size = read_int(stream)
+        data["creation_date"] = datetime.datetime.fromtimestamp(stream.read_long() / 1000).strftime('%Y-%m-%d %H:%M:%S')
+        data["cell_list_size"] = stream.read_int()
+        data["center_point"] = [stream.read_int(), stream.read_int(), stream.read_int()]
+        data["width"] = stream.read_int()
+        data["height"] = stream.read_int()
+        data["depth"] = stream.read_int()
+        if(stream.read_bool()):
+            data["background_music"] = stream.read_string()
+        if(stream.read_bool()):
+            data["channel_name"] = stream.read_string()
+        if(stream.read_bool()):
+            data["ban_mask"] = stream.read_string()
+        if(stream.read_bool()):
+            data["channel_topic"] = stream.read_string()
+        data["max_irc_users"] = stream.read_int()
+        data["is_private_channel"] = stream.read_bool()
+        data["is_secret_channel"] = stream.read_bool()
+        data["is_invite_only_channel"] = stream.read_bool()
+        data["is_quiet_channel"] = stream.read_bool()
+        world_entries_size = stream.read_int()
         data["world_entries"] = []
         for i in range(world_entries_size):
             entry = {}
-            entry["name"] = read_string(stream)
-            entry_pos = [read_float(stream), read_float(stream), read_float(stream)]
+            entry["name"] = stream.read_string()
+            entry_pos = [stream.read_float(), stream.read_float(), stream.read_float()]
             entry["position"] = [entry_pos[0], entry_pos[2], entry_pos[1]]
-            entry_rot = [read_float(stream), read_float(stream), read_float(stream)]
+            entry_rot = [stream.read_float(), stream.read_float(), stream.read_float()]
             entry["rotation"] = [entry_rot[0], entry_rot[2], entry_rot[1]]
-            entry["cell"] = read_string(stream)
-            entry["type"] = read_int(stream)
+            entry["cell"] = stream.read_string()
+            entry["type"] = stream.read_int()
             data["world_entries"].append(entry)
-        data["ambient_light"] = [read_float(stream), read_float(stream), read_float(stream), read_float(stream)]
-        light_count = read_short(stream)
+        data["ambient_light"] = [stream.read_float(), stream.read_float(), stream.read_float(), stream.read_float()]
+        light_count = stream.read_short()
         data["lights"] = []
         if(light_count > 0):
-            data["has_lights"] = read_bool(stream)
+            data["has_lights"] = stream.read_bool()
             if(version >= 802):
-                data["has_lightmaps"] = read_bool(stream)
+                data["has_lightmaps"] = stream.read_bool()
             else:
                 data["has_lightmaps"] = data["has_lights"]
             for i in range(light_count):
                 light = {}
-                light["type"] = read_byte(stream)
-                light["position"] = [read_int(stream), read_int(stream), read_int(stream)]
-                light["intensity"] = read_float(stream)
-                light["color"] = [read_short(stream), read_short(stream), read_short(stream)]
-                light["near"] = read_short(stream)
-                light["far"] = read_short(stream)
-                light["shadows"] = read_byte(stream)
-                light["name"] = read_string(stream)
-                excluded_cell_count = read_byte(stream)
+                light["type"] = stream.read_byte()
+                light["position"] = [stream.read_int(), stream.read_int(), stream.read_int()]
+                light["intensity"] = stream.read_float()
+                light["color"] = [stream.read_short(), stream.read_short(), stream.read_short()]
+                light["near"] = stream.read_short()
+                light["far"] = stream.read_short()
+                light["shadows"] = stream.read_byte()
+                light["name"] = stream.read_string()
+                excluded_cell_count = stream.read_byte()
                 if(excluded_cell_count > 0):
                     light["excluded_cells"] = []
                     for j in range(excluded_cell_count):
-                        light["excluded_cells"].append(read_string(stream))
+                        light["excluded_cells"].append(stream.read_string())
                 data["lights"].append(light)
-        if(read_bool(stream)):
+        if(stream.read_bool()):
             print("new stuff")
-            aa = read_int(stream)
+            aa = stream.read_int()
             print(aa)
             data["aaa"] = []
             for i in range(aa):
-                data["aaa"].append([read_int(stream), read_int(stream), read_int(stream), read_int(stream)])
+                data["aaa"].append([stream.read_int(), stream.read_int(), stream.read_int(), stream.read_int()])
             data["bbb"] = []
             for i in range(aa):
-                bb = read_int(stream)
+                bb = stream.read_int()
                 print(bb)
                 if(bb > 0):
                     arr = []
                     for j in range(bb):
-                        arr.append(read_int(stream))
+                        arr.append(stream.read_int())
                     data["bbb"].append(arr)
                 else:
                     data["bbb"].append([])
-            cc = read_int(stream)
+            cc = stream.read_int()
             print(cc)
             data["ccc"] = []
             for i in range(cc):
-                data["ccc"].append(read_int(stream))
-            dd = read_int(stream)
+                data["ccc"].append(stream.read_int())
+            dd = stream.read_int()
             data["ddd"] = []
             for i in range(dd):
-                data["ddd"].append(read_float(stream))
-            ee = read_int(stream)
+                data["ddd"].append(stream.read_float())
+            ee = stream.read_int()
             data["eee"] = []
             for i in range(ee):
-                data["eee"].append(read_string(stream))
-            ff = read_int(stream)
+                data["eee"].append(stream.read_string())
+            ff = stream.read_int()
             data["fff"] = []
             for i in range(ff):
-                data["fff"].append([read_int(stream), read_int(stream)])
+                data["fff"].append([stream.read_int(), stream.read_int()])
             print("new stuff")
-            if(read_bool(stream)):
-                gg = read_int(stream)
+            if(stream.read_bool()):
+                gg = stream.read_int()
                 print(gg)
                 data["ggg"] = []
                 for i in range(gg):
-                    j = read_int(stream)
+                    j = stream.read_int()
                     if(j == -1):
                         data["ggg"].append("null")
                     else:
                         arr = []
                         for k in range(j):
-                            str = read_string(stream)
-                            if(str.lower() == "rotate"):
-                                arrlen = read_int(stream)   
+                            name = stream.read_string()
+                            if(name.lower() == "rotate"):
+                                arrlen = stream.read_int()   
                                 for l in range(arrlen):
-                                    arr.append(read_int(stream))
-                            elif(str.lower() == "flag"):
-                                arrlen = read_int(stream)        
+                                    arr.append(stream.read_int())
+                            elif(name.lower() == "flag"):
+                                arrlen = stream.read_int()        
                                 for l in range(arrlen):
-                                    arr.append(read_string(stream))
+                                    arr.append(stream.read_string())
                         data["ggg"].append({
-                            "name": str,
+                            "name": name,
                             "data": arr
                         })
 
-        data["cells"] = []
-        for i in range(data["cell_list_size"]):
-            cellpath = os.path.join(os.path.dirname(os.path.abspath(filepath)), "c" + str(i) + ".dmg")
-            if(os.path.exists(cellpath) == False):
-                print("Cell " + str(i) + " not found!")
-                continue
-            print("Cell " + str(i) + " found! Loading...")
-            file_input_stream = open(cellpath, "rb")
-            gzip_input_stream = gzip.GzipFile(fileobj=file_input_stream, mode='rb')
-            buffered_input_stream = BufferedReader(gzip_input_stream)
-            cell_version = read_short(buffered_input_stream)
-            data["cells"].append(ImporterAliasDMG.get_cell_data(buffered_input_stream, cell_version))
         return data
 
-    def get_cell_data(stream, version):
+    # Sections that aren't in sections are skipped over without being decoded and are left out of the cell
+    def get_cell_data(stream, version, swap_lightmaps=True, sections=ALL_SECTIONS, stats=NULL_STATS):
         cell = {}
-        cell["map_cell_version"] = version
-        cell_pos = [read_int(stream), read_int(stream), read_int(stream)]
-        cell["position"] = [-cell_pos[0], cell_pos[2], cell_pos[1]]
-        cell["width"] = read_int(stream)
-        cell["height"] = read_int(stream)
-        cell["depth"] = read_int(stream)
-        cell["xl"] = read_int(stream)
-        cell["xr"] = read_int(stream)
-        cell["yt"] = read_int(stream)
-        cell["yb"] = read_int(stream)
-        cell["zb"] = read_int(stream)
-        cell["zf"] = read_int(stream)
-        cell["id"] = read_int(stream)
-        cell["name"] = read_string(stream)
-        cell["total_face_count"] = read_int(stream)
-        cell["total_reg_faces"] = read_int(stream)
-        cell["total_alpha_faces"] = read_int(stream)
-        cell["texture_count"] = read_short(stream)
-        cell["texture_alpha_count"] = read_short(stream)
-        cell["portal_count"] = read_int(stream)
-        if(version >= 1296):
-            cell["gravity"] = read_float(stream)
-            cell["enable_combat"] = read_bool(stream)
-            cell["irc_channel"] = read_string(stream)
-        else:
-            cell["gravity"] = 9.81
-            cell["enable_combat"] = True
-            cell["irc_channel"] = ""
-        cell["face_start"] = []
-        cell["face_count"] = []
-        cell["texture_list"] = []
-        for i in range(cell["texture_count"]):
-            cell["texture_list"].append(read_string(stream))
-            cell["face_start"].append(read_int(stream))
-            cell["face_count"].append(read_int(stream))
-        cell["alpha_texture_list"] = []
-        cell["alpha_face_count"] = []
-        if(cell["texture_alpha_count"] > 0):
-            for i in range(cell["texture_alpha_count"]):
-                cell["alpha_texture_list"].append(read_string(stream))
-                cell["alpha_face_count"].append(read_int(stream))
-        vertex_count = (cell["total_reg_faces"] + cell["portal_count"] * 2) * 9
-        cell["vertex"] = []
-        for i in range(0, vertex_count, 3):
-            pos = [read_float(stream), read_float(stream), read_float(stream)]
-            cell["vertex"].append([-pos[0], pos[2], pos[1]])
-        texcoord_count = cell["total_reg_faces"] * 6
-        cell["texcoord"] = []
-        for i in range(0, texcoord_count, 6):
-            uv1 = [read_float(stream), read_float(stream)]
-            uv2 = [read_float(stream), read_float(stream)]
-            uv3 = [read_float(stream), read_float(stream)]
-            cell["texcoord"].append(uv1)
-            cell["texcoord"].append(uv3)
-            cell["texcoord"].append(uv2)
-        # vertex_color_count = cell["total_reg_faces"] * 9
-        # cell["vertex_color"] = []
-        # for i in range(0, vertex_color_count, 3):
-        #     pos = [read_float(stream), read_float(stream), read_float(stream)]
-        #     cell["vertex_color"].append([-pos[0], pos[2], pos[1]])
-        alpha_vertex_count = cell["total_alpha_faces"] * 9
-        cell["alpha_vertex"] = []
-        for i in range(0, alpha_vertex_count, 3):
-            pos = [read_float(stream), read_float(stream), read_float(stream)]
-            cell["alpha_vertex"].append([-pos[0], pos[2], pos[1]])
-        alpha_texcoord_count = cell["total_alpha_faces"] * 6
-        cell["alpha_texcoord"] = []
-        for i in range(0, alpha_texcoord_count, 2):
-            cell["alpha_texcoord"].append([read_float(stream), read_float(stream)])
-        # alpha_vertex_color_count = cell["total_alpha_faces"] * 9
-        # cell["alpha_vertex_color"] = []
-        # for i in range(0, alpha_vertex_color_count, 3):
-        #     pos = [read_float(stream), read_float(stream), read_float(stream)]
-        #     cell["alpha_vertex_color"].append([-pos[0], pos[2], pos[1]])
-        if(read_bool(stream)):
-            cell["opaque_qbt"] = ImporterAliasDMG.read_qbtree(stream)
-        if(read_bool(stream)):
-            cell["alpha_bsp_node"] = ImporterAliasDMG.read_bsp(stream)
-        cell["portal_plane"] = []
-        cell["portal_center"] = []
-        cell["portal_radius"] = []
-        cell["portal_link"] = []
-        cell["portal_name"] = []
-        cell["portal_vis_node_list"] = []
-        for i in range(cell["portal_count"]):
-            cell["portal_plane"].append([read_float(stream), read_float(stream), read_float(stream), read_float(stream)])
-            cell["portal_center"].append([read_float(stream), read_float(stream), read_float(stream)])
-            cell["portal_radius"].append(read_float(stream))
-            cell["portal_link"].append(read_int(stream))
-            cell["portal_name"].append(read_string(stream))
-            cell["portal_vis_node_list"].append(ImporterAliasDMG.read_portal_vis_node(stream))
-        if(read_bool(stream)):
-            cell["light_tree"] = ImporterAliasDMG.read_light_tree(stream)
-        lightmap_count = read_int(stream)
-        cell["lightmap"] = []
-        for i in range(lightmap_count):
-            lightmap_n = read_int(stream)
-            current = []
-            for j in range(65536):
-                current.append(read_short(stream))
-            cell["lightmap"].append(current)
-        if(len(cell["lightmap"]) > 0):
-            cell["lightmap_texcoord"] = []
-            for i in range(0, texcoord_count, 3):
-                cell["lightmap_texcoord"].append([read_float(stream), read_float(stream), read_float(stream)])
-            cell["lightmap_tex_index"] = []
+        with stats.stage(STAGE_GEOMETRY, stream):
+            cell["map_cell_version"] = version
+            cell_pos = [stream.read_int(), stream.read_int(), stream.read_int()]
+            cell["position"] = [-cell_pos[0], cell_pos[2], cell_pos[1]]
+            cell["width"] = stream.read_int()
+            cell["height"] = stream.read_int()
+            cell["depth"] = stream.read_int()
+            cell["xl"] = stream.read_int()
+            cell["xr"] = stream.read_int()
+            cell["yt"] = stream.read_int()
+            cell["yb"] = stream.read_int()
+            cell["zb"] = stream.read_int()
+            cell["zf"] = stream.read_int()
+            cell["id"] = stream.read_int()
+            cell["name"] = stream.read_string()
+            cell["total_face_count"] = stream.read_int()
+            cell["total_reg_faces"] = stream.read_int()
+            cell["total_alpha_faces"] = stream.read_int()
+            cell["texture_count"] = stream.read_short()
+            cell["texture_alpha_count"] = stream.read_short()
+            cell["portal_count"] = stream.read_int()
+            if(version >= 1296):
+                cell["gravity"] = stream.read_float()
+                cell["enable_combat"] = stream.read_bool()
+                cell["irc_channel"] = stream.read_string()
+            else:
+                cell["gravity"] = 9.81
+                cell["enable_combat"] = True
+                cell["irc_channel"] = ""
+            cell["face_start"] = []
+            cell["face_count"] = []
+            cell["texture_list"] = []
             for i in range(cell["texture_count"]):
-                cell["lightmap_tex_index"].append(read_short(stream))
-            l = cell["alpha_face_count"] * 6
-            cell["alpha_lightmap_texcoord"] = []
-            for i in range(0, alpha_texcoord_count, 3):
-                cell["alpha_lightmap_texcoord"].append([read_float(stream), read_float(stream), read_float(stream)])
-            cell["alpha_lightmap_tex_index"] = read_short(stream)
-        else:
-            cell["lightmap_texcoord"] = cell["texcoord"]
-            cell["alpha_lightmap_texcoord"] = cell["alpha_texcoord"]
+                cell["texture_list"].append(stream.read_string())
+                cell["face_start"].append(stream.read_int())
+                cell["face_count"].append(stream.read_int())
+            cell["alpha_texture_list"] = []
+            cell["alpha_face_count"] = []
+            if(cell["texture_alpha_count"] > 0):
+                for i in range(cell["texture_alpha_count"]):
+                    cell["alpha_texture_list"].append(stream.read_string())
+                    cell["alpha_face_count"].append(stream.read_int())
+            vertex_count = (cell["total_reg_faces"] + cell["portal_count"] * 2) * 9
+            cell["vertex"] = stream.read_vectors(vertex_count)
+            texcoord_count = cell["total_reg_faces"] * 6
+            # Each face stores its uvs as uv1, uv2, uv3 which are reordered to uv1, uv3, uv2
+            cell["texcoord"] = stream.read_floats(texcoord_count).reshape(-1, 3, 2)[:, [0, 2, 1]].reshape(-1, 2)
+            # vertex_color_count = cell["total_reg_faces"] * 9
+            # cell["vertex_color"] = stream.read_vectors(vertex_color_count)
+            alpha_vertex_count = cell["total_alpha_faces"] * 9
+            cell["alpha_vertex"] = stream.read_vectors(alpha_vertex_count)
+            alpha_texcoord_count = cell["total_alpha_faces"] * 6
+            cell["alpha_texcoord"] = stream.read_floats(alpha_texcoord_count).reshape(-1, 2)
+            # alpha_vertex_color_count = cell["total_alpha_faces"] * 9
+            # cell["alpha_vertex_color"] = stream.read_vectors(alpha_vertex_color_count)
+        with stats.stage(STAGE_BSP, stream):
+            if(stream.read_bool()):
+                if(SECTION_BSP in sections):
+                    cell["opaque_qbt"] = ImporterAliasDMG.read_qbtree(stream)
+                else:
+                    ImporterAliasDMG.skip_qbtree(stream)
+            if(stream.read_bool()):
+                if(SECTION_BSP in sections):
+                    cell["alpha_bsp_node"] = ImporterAliasDMG.read_bsp(stream)
+                else:
+                    ImporterAliasDMG.skip_bsp(stream)
+        with stats.stage(STAGE_PORTALS, stream):
+            cell["portal_plane"] = []
+            cell["portal_center"] = []
+            cell["portal_radius"] = []
+            cell["portal_link"] = []
+            cell["portal_name"] = []
+            if(SECTION_PORTAL_VIS in sections):
+                cell["portal_vis_node_list"] = []
+            for i in range(cell["portal_count"]):
+                cell["portal_plane"].append([stream.read_float(), stream.read_float(), stream.read_float(), stream.read_float()])
+                cell["portal_center"].append([stream.read_float(), stream.read_float(), stream.read_float()])
+                cell["portal_radius"].append(stream.read_float())
+                cell["portal_link"].append(stream.read_int())
+                cell["portal_name"].append(stream.read_string())
+                if(SECTION_PORTAL_VIS in sections):
+                    cell["portal_vis_node_list"].append(ImporterAliasDMG.read_portal_vis_node(stream))
+                else:
+                    ImporterAliasDMG.skip_portal_vis_node(stream)
+        with stats.stage(STAGE_LIGHT_TREE, stream):
+            if(stream.read_bool()):
+                if(SECTION_LIGHT_TREE in sections):
+                    cell["light_tree"] = ImporterAliasDMG.read_light_tree(stream)
+                else:
+                    ImporterAliasDMG.skip_light_tree(stream)
+        with stats.stage(STAGE_LIGHTMAPS, stream):
+            lightmap_count = stream.read_int()
+            if(SECTION_LIGHTMAPS not in sections):
+                # The lightmaps are followed by their texcoords and texture indices, which are only there when there are lightmaps
+                if(lightmap_count > 0):
+                    stream.skip(lightmap_count * LIGHTMAP_DTYPE.itemsize + (texcoord_count + alpha_texcoord_count) * 4 + cell["texture_count"] * 2 + 2)
+                return cell
+            cell["lightmap"] = stream.read_lightmaps(lightmap_count, swap_lightmaps)
+            if(len(cell["lightmap"]) > 0):
+                cell["lightmap_texcoord"] = stream.read_floats(texcoord_count).reshape(-1, 3)
+                cell["lightmap_tex_index"] = []
+                for i in range(cell["texture_count"]):
+                    cell["lightmap_tex_index"].append(stream.read_short())
+                cell["alpha_lightmap_texcoord"] = stream.read_floats(alpha_texcoord_count).reshape(-1, 3)
+                cell["alpha_lightmap_tex_index"] = stream.read_short()
+            else:
+                cell["lightmap_texcoord"] = cell["texcoord"]
+                cell["alpha_lightmap_texcoord"] = cell["alpha_texcoord"]
         return cell
 
-    def get_map_data_from_cell(stream, version):
+    def get_map_data_from_cell(stream, version, swap_lightmaps=True, sections=ALL_SECTIONS, stats=NULL_STATS):
         data = {}
-        cell_data = ImporterAliasDMG.get_cell_data(stream, version)
+        cell_data = ImporterAliasDMG.get_cell_data(stream, version, swap_lightmaps, sections, stats)
         data["locale_data_version"] = version
         data["locale_id"] = 0
         data["world_name"] = "unknown"
@@ -292,96 +285,104 @@ class ImporterAliasDMG():
 
     def read_qbtree(stream):
         qbtree = {}
-        qbtree["version"] = read_short(stream) # In Alias Underground, if this is < 2 then it will refuse to load
+        qbtree["version"] = stream.read_short() # In Alias Underground, if this is < 2 then it will refuse to load
         print("Reading QBTree version " + str(qbtree["version"]) + "...")
         qbtree["quad"] = ImporterAliasDMG.read_quad(stream)
         return
     
     def read_quad(stream):
         quad = {}
-        quadVersion = read_byte(stream) # In Alias Underground, if this is < 2 then it will refuse to load
-        print("Reading Quad version " + str(quadVersion) + "...")
-        quad["aa"] = read_byte(stream)
-        quad["bb"] = read_int(stream)
-        quad["cc"] = [read_int(stream), read_int(stream), read_int(stream)]
-        quad["dd"] = read_int(stream)
-        quad["ee"] = read_int(stream)
-        quad["ff"] = read_int(stream)
-        ggLen = read_short(stream)
+        quadVersion = stream.read_byte() # In Alias Underground, if this is < 2 then it will refuse to load
+        quad["aa"] = stream.read_byte()
+        quad["bb"] = stream.read_int()
+        quad["cc"] = [stream.read_int(), stream.read_int(), stream.read_int()]
+        quad["dd"] = stream.read_int()
+        quad["ee"] = stream.read_int()
+        quad["ff"] = stream.read_int()
+        ggLen = stream.read_short()
         quad["gg"] = []
         quad["hh"] = []
         for i in range(ggLen):
-            quad["gg"].append(read_int(stream))
-            quad["hh"].append(read_short(stream))
-        iiLen = read_short(stream)
+            quad["gg"].append(stream.read_int())
+            quad["hh"].append(stream.read_short())
+        iiLen = stream.read_short()
         quad["ii"] = []
         quad["jj"] = []
         for i in range(iiLen):
-            quad["ii"].append(read_int(stream))
-            quad["jj"].append(read_short(stream))
-        if(read_bool(stream)):
+            quad["ii"].append(stream.read_int())
+            quad["jj"].append(stream.read_short())
+        if(stream.read_bool()):
             quad["kk"] = ImporterAliasDMG.read_quad(stream)
-        if(read_bool(stream)):
+        if(stream.read_bool()):
             quad["ll"] = ImporterAliasDMG.read_quad(stream)
         return quad
 
-    # Recursive function for reading the BSP tree
+    # Reads the BSP tree into typed arrays, see read_bsp_nodes for the layout
     def read_bsp(stream):
         bsp_node = {}
-        bsp_node["version"] = read_short(stream) # In Alias Underground, if this is < 4 then it will refuse to load
-        bsp_node["node_count"] = read_int(stream)
-        bsp_node["ppe"] = []
-        bsp_node["n_polys"] = []
-        bsp_node["vertex_index"] = []
-        bsp_node["front"] = []
-        bsp_node["back"] = []
-        bsp_node["tex_index"] = []
-        bsp_node["i1"] = []
-        bsp_node["i2"] = []
-        for j in range(bsp_node["node_count"]):
-            bsp_node["ppe"].append([read_float(stream), read_float(stream), read_float(stream), read_float(stream)])
-            bsp_node["n_polys"].append(read_short(stream))
-            vertex_index = []
-            tex_index = []
-            for k in range(bsp_node["n_polys"][j]):
-                vertex_index.append(read_int(stream))
-                tex_index.append(read_short(stream))
-            bsp_node["vertex_index"].append(vertex_index)
-            bsp_node["tex_index"].append(tex_index)
-            bsp_node["front"].append(read_int(stream))
-            bsp_node["back"].append(read_int(stream))
-            bsp_node["i1"].append(read_byte(stream))
-            bsp_node["i2"].append(read_byte(stream))
+        bsp_node["version"] = stream.read_short() # In Alias Underground, if this is < 4 then it will refuse to load
+        bsp_node["node_count"] = stream.read_int()
+        bsp_node.update(read_bsp_nodes(stream, bsp_node["node_count"]))
         print("Loaded BSP with " + str(bsp_node["node_count"]) + " nodes")
         return bsp_node
 
-    # Recursive function for reading the portal tree
+    # Reads the portal tree into a flat node table, get_portal_vis_node_view turns it back into nested dicts
     def read_portal_vis_node(stream):
-        portal_vis_node = {}
-        portal_vis_node["a"] = read_int(stream)
-        portal_var_size = read_int(stream)
-        portal_vis_node["b"] = []
-        portal_vis_node["c"] = []
-        for k in range(portal_var_size):
-            portal_vis_node["b"].append(read_int(stream))
-            portal_vis_node["c"].append(ImporterAliasDMG.read_portal_vis_node(stream))
-        print("Loaded portal vis node with " + str(portal_var_size) + " children")
-        return portal_vis_node
+        return read_portal_vis_nodes(stream, False)
 
-    # Recursive function for reading the light tree
+    # Reads the light tree into a flat node table, get_light_tree_view turns it back into nested dicts
     def read_light_tree(stream):
-        light_tree = {}
-        light_tree["light_count"] = read_short(stream)
-        light_tree["light_list"] = []
-        for j in range(light_tree["light_count"]):
-            light_tree["light_list"].append(read_short(stream))
-        light_tree["x_mid"] = read_int(stream)
-        light_tree["y_mid"] = read_int(stream)
-        light_tree["z_mid"] = read_int(stream)
-        light_tree["light_quads"] = []
-        for j in range(8):
-            if(read_bool(stream)):
-                light_tree["light_quads"].append(ImporterAliasDMG.read_light_tree(stream))
-        print("Loaded light tree with " + str(light_tree["light_count"]) + " lights")
-        return light_tree
+        return read_light_tree_nodes(stream)
+
+    # Steps over a QBTree without decoding it, keeping a count of the child flags still to be read for every open quad
+    def skip_qbtree(stream):
+        stream.skip(2)
+        ImporterAliasDMG.skip_quad_header(stream)
+        remaining = [2]
+        while remaining:
+            if(remaining[-1] == 0):
+                remaining.pop()
+                continue
+            remaining[-1] -= 1
+            if(stream.read_bool()):
+                ImporterAliasDMG.skip_quad_header(stream)
+                remaining.append(2)
+
+    # Everything in a quad before its two child flags
+    def skip_quad_header(stream):
+        stream.skip(30)
+        stream.skip(stream.read_short() * 6)
+        stream.skip(stream.read_short() * 6)
 
+    # Steps over a BSP tree without decoding it, only the polygon count of every node is read
+    def skip_bsp(stream):
+        stream.skip(2)
+        node_count = stream.read_int()
+        for j in range(node_count):
+            stream.skip(16)
+            stream.skip(stream.read_short() * 6 + 10)
+
+    # Steps over a portal vis tree without decoding it, keeping a count of the children still to be read for every open node
+    def skip_portal_vis_node(stream):
+        stream.skip(4)
+        remaining = [stream.read_int()]
+        while remaining:
+            if(remaining[-1] == 0):
+                remaining.pop()
+                continue
+            remaining[-1] -= 1
+            stream.skip(8)
+            remaining.append(stream.read_int())
+
+    # Steps over a light tree without decoding it, keeping a count of the child flags still to be read for every open node
+    def skip_light_tree(stream):
+        stream.skip(stream.read_short() * 2 + 12)
+        remaining = [8]
+        while remaining:
+            if(remaining[-1] == 0):
+                remaining.pop()
+                continue
+            remaining[-1] -= 1
+            if(stream.read_bool()):
+                stream.skip(stream.read_short() * 2 + 12)
+                remaining.append(8)
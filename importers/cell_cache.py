@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import zipfile
+import numpy as np
+
+# Bump whenever the layout of parsed cells changes, so entries written by older versions are never loaded
+CACHE_VERSION = 3
+
+DEFAULT_CACHE_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "trimorph_tools", "cells")
+DEFAULT_SIZE_LIMIT = 2048 << 20
+
+METADATA_NAME = "metadata"
+
+class CellCache():
+    """Keeps parsed cells on disk so unchanged cells don't have to be decompressed and parsed again.
+
+    Every entry is a single .npz file holding the cell's numeric arrays plus a JSON metadata record for
+    everything else. Entries are keyed by the cell's path, size, mtime and content hash. When the cache
+    grows past size_limit bytes the least recently used entries are removed.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIRECTORY, size_limit=DEFAULT_SIZE_LIMIT):
+        self.directory = directory
+        self.size_limit = size_limit
+
+    def get_key(self, cellpath, compressed, options):
+        stat = os.stat(cellpath)
+        content_hash = hashlib.blake2b(compressed, digest_size=16).hexdigest()
+        key = json.dumps([CACHE_VERSION, os.path.abspath(cellpath), stat.st_size, stat.st_mtime_ns, content_hash, options])
+        return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get_entry_path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def load(self, key):
+        entry_path = self.get_entry_path(key)
+        try:
+            cell = load_npz(entry_path)
+            # Entries are evicted by mtime, so touching them marks them as recently used
+            os.utime(entry_path)
+        except (OSError, ValueError, zipfile.BadZipFile):
+            return None
+        return cell
+
+    def store(self, key, cell):
+        os.makedirs(self.directory, exist_ok=True)
+        save_npz(self.get_entry_path(key), cell)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if(name.endswith(".npz") == False):
+                continue
+            entry_path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(entry_path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+        total_size = sum(entry[1] for entry in entries)
+        entries.sort()
+        for mtime, size, entry_path in entries:
+            if(total_size <= self.size_limit):
+                break
+            try:
+                os.remove(entry_path)
+            except OSError:
+                pass
+            total_size -= size
+
+# Writes parsed data as a single .npz file holding its numeric arrays plus a JSON metadata record for everything else.
+# The file is written under a temporary name first so readers never see a partial file
+def save_npz(filepath, value):
+    arrays = {}
+    metadata = encode_cell(value, arrays)
+    arrays[METADATA_NAME] = np.frombuffer(json.dumps(metadata).encode("utf-8"), dtype=np.uint8)
+    temp_path = filepath + "." + str(os.getpid()) + ".tmp"
+    with open(temp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(temp_path, filepath)
+
+def load_npz(filepath):
+    with np.load(filepath, allow_pickle=False) as archive:
+        arrays = {}
+        for name in archive.files:
+            arrays[name] = archive[name]
+    metadata = json.loads(arrays.pop(METADATA_NAME).tobytes().decode("utf-8"))
+    return decode_cell(metadata, arrays)
+
+# Replaces every array in a parsed cell with a reference into arrays, leaving only JSON values behind
+def encode_cell(value, arrays):
+    if(isinstance(value, np.ndarray)):
+        name = "a" + str(len(arrays))
+        arrays[name] = value
+        return {"__array__": name}
+    if(isinstance(value, dict)):
+        encoded = {}
+        for key in value:
+            encoded[key] = encode_cell(value[key], arrays)
+        return encoded
+    if(isinstance(value, (list, tuple))):
+        return [encode_cell(item, arrays) for item in value]
+    if(isinstance(value, np.generic)):
+        return value.item()
+    return value
+
+def decode_cell(value, arrays):
+    if(isinstance(value, dict)):
+        if("__array__" in value):
+            return arrays[value["__array__"]]
+        decoded = {}
+        for key in value:
+            decoded[key] = decode_cell(value[key], arrays)
+        return decoded
+    if(isinstance(value, list)):
+        return [decode_cell(item, arrays) for item in value]
+    return value
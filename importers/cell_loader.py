@@ -0,0 +1,159 @@
+import multiprocessing
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from ..data_stream import *
+from ..import_stats import *
+from .raw_cell import SectionRecorder, get_cell_sections
+
+# Sections of a cell that aren't needed to build its render geometry. Any section left out of the
+# sections a cell is loaded with is stepped over in the stream instead of being decoded
+SECTION_LIGHTMAPS = "lightmaps"
+SECTION_BSP = "bsp"
+SECTION_PORTAL_VIS = "portal_vis"
+SECTION_LIGHT_TREE = "light_tree"
+ALL_SECTIONS = frozenset([SECTION_LIGHTMAPS, SECTION_BSP, SECTION_PORTAL_VIS, SECTION_LIGHT_TREE])
+
+def get_cell_path(filepath, index):
+    return os.path.join(os.path.dirname(os.path.abspath(filepath)), "c" + str(index) + ".dmg")
+
+# With a CellCache the parsed cell is loaded from disk when the file hasn't changed since it was last parsed.
+# With a RawCellStore the decompressed cell is mapped in from its sidecar instead of being inflated again, and the sidecar
+# is written the first time the cell is loaded. prepare_cell is called on the parsed cell and what it returns is loaded instead, it's never cached
+def load_cell(cellpath, get_cell_data, swap_lightmaps=True, cell_cache=None, sections=ALL_SECTIONS, stats=NULL_STATS, prepare_cell=None, raw_cells=None):
+    cell = parse_cell(cellpath, get_cell_data, swap_lightmaps, cell_cache, sections, stats, raw_cells)
+    if(prepare_cell is not None):
+        with stats.stage(STAGE_PREPARE):
+            cell = prepare_cell(cell)
+    return cell
+
+def parse_cell(cellpath, get_cell_data, swap_lightmaps=True, cell_cache=None, sections=ALL_SECTIONS, stats=NULL_STATS, raw_cells=None):
+    compressed = None
+    if(cell_cache is not None):
+        with open(cellpath, "rb") as f:
+            compressed = f.read()
+        with stats.stage(STAGE_CELL_CACHE) as stage:
+            key = cell_cache.get_key(cellpath, compressed, [get_cell_data.__qualname__, swap_lightmaps, sorted(sections)])
+            cell = cell_cache.load(key)
+            stage.add_bytes(len(compressed))
+        if(cell is not None):
+            print("Loaded " + cellpath + " from the cell cache")
+            return cell
+    raw_cell = None
+    if(raw_cells is not None):
+        with stats.stage(STAGE_RAW_CELL):
+            raw_cell = raw_cells.open(cellpath)
+    if(raw_cell is not None):
+        buffer = raw_cell.buffer
+    else:
+        if(compressed is None):
+            with open(cellpath, "rb") as f:
+                compressed = f.read()
+        with stats.stage(STAGE_DECOMPRESS) as stage:
+            buffer = decompress_gzip(compressed)
+            stage.add_bytes(len(compressed))
+    stream = DataReader(buffer)
+    cell_version = stream.read_short()
+    # The table of contents of a new sidecar comes from where the stages of the parser start and end
+    recorder = SectionRecorder(stats) if raw_cells is not None and raw_cell is None else None
+    cell = get_cell_data(stream, cell_version, swap_lightmaps, sections, stats if recorder is None else recorder)
+    if(recorder is not None):
+        with stats.stage(STAGE_RAW_CELL):
+            raw_cells.store(cellpath, buffer, get_cell_sections(cell, recorder.ranges, buffer))
+    if(cell_cache is not None):
+        cell_cache.store(key, cell)
+    return cell
+
+# Runs in a worker process, the stats it records are sent back with the cell so the main process can merge them
+def load_cell_in_worker(cellpath, get_cell_data, swap_lightmaps, cell_cache, sections, stats, prepare_cell, raw_cells):
+    cell = load_cell(cellpath, get_cell_data, swap_lightmaps, cell_cache, sections, stats, prepare_cell, raw_cells)
+    stats.stop()
+    return cell, stats
+
+# Loads c0.dmg ... cN.dmg next to the map file one at a time, skipping any cell that doesn't exist.
+# With parallel=True the cells are decompressed and parsed by a pool of worker processes, one per core.
+# Only as many cells as there are workers are parsed ahead of the consumer, so memory stays bounded.
+# prepare_cell runs in the workers too, so it has to be a module level function that doesn't need bpy
+def iter_cells(filepath, cell_count, get_cell_data, swap_lightmaps=True, parallel=False, cell_cache=None, sections=ALL_SECTIONS, stats=NULL_STATS, prepare_cell=None, raw_cells=None):
+    cellpaths = []
+    for i in range(cell_count):
+        cellpath = get_cell_path(filepath, i)
+        if(os.path.exists(cellpath) == False):
+            print("Cell " + str(i) + " not found!")
+            continue
+        print("Cell " + str(i) + " found! Loading...")
+        cellpaths.append(cellpath)
+
+    workers = min(os.cpu_count() or 1, len(cellpaths))
+    if(parallel == False or workers <= 1):
+        for cellpath in cellpaths:
+            yield load_cell(cellpath, get_cell_data, swap_lightmaps, cell_cache, sections, stats, prepare_cell, raw_cells)
+        return
+
+    # Blender can't safely be forked, so the workers are spawned and import the parsers without bpy
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        # The workers time their own stages, so with several workers the stage times add up to more than the wall time
+        worker_stats = ImportStats(stats.track_memory) if stats.enabled else NULL_STATS
+        pending = deque()
+        for cellpath in cellpaths:
+            if(len(pending) >= workers):
+                yield get_worker_cell(pending.popleft(), stats)
+            pending.append(executor.submit(load_cell_in_worker, cellpath, get_cell_data, swap_lightmaps, cell_cache, sections, worker_stats, prepare_cell, raw_cells))
+        while pending:
+            yield get_worker_cell(pending.popleft(), stats)
+
+def get_worker_cell(future, stats):
+    cell, worker_stats = future.result()
+    stats.merge(worker_stats)
+    return cell
+
+# Pulls items out of an iterator on a background thread, staying up to depth items ahead of the consumer.
+# The cells of a locale are decompressed, parsed and prepared this way while the main thread, which is the only one
+# that may touch Blender data, builds the meshes of the cell before. on_item is called on the background thread
+# with every item before it's handed over. Errors raised by the iterator are raised again in the consumer
+def iter_in_background(items, depth=2, on_item=None):
+    handoff = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+
+    def produce():
+        try:
+            for item in items:
+                if(on_item is not None):
+                    on_item(item)
+                if(put_unless_stopped(handoff, (True, item), stopped) == False):
+                    return
+        except BaseException as error:
+            put_unless_stopped(handoff, (False, error), stopped)
+            return
+        finally:
+            # Lets a generator clean up, e.g. shut down its worker processes, when it isn't run to the end
+            if(hasattr(items, "close")):
+                items.close()
+        put_unless_stopped(handoff, (False, None), stopped)
+
+    thread = threading.Thread(target=produce, name="TrimorphTools cell loader", daemon=True)
+    thread.start()
+    try:
+        while True:
+            has_item, item = handoff.get()
+            if(has_item == False):
+                if(item is not None):
+                    raise item
+                return
+            yield item
+    finally:
+        # The consumer can stop early, in which case the producer gives up on the item it's waiting to hand over
+        stopped.set()
+        thread.join()
+
+def put_unless_stopped(handoff, entry, stopped):
+    while stopped.is_set() == False:
+        try:
+            handoff.put(entry, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
@@ -0,0 +1,157 @@
+import json
+import mmap
+import os
+import numpy as np
+from ..data_stream import *
+from ..import_stats import *
+
+# Bump whenever the layout of the table of contents changes, so sidecars written by older versions are never used
+RAW_CELL_VERSION = 1
+
+RAW_SUFFIX = ".raw"
+TOC_SUFFIX = ".toc"
+
+# The big-endian dtype and row width of every section that holds a single array, for get_view.
+# The vertex section holds the vertices of the portals after the vertices of the faces
+SECTION_ARRAYS = {
+    "vertex": ('>f4', 3),
+    "texcoord": ('>f4', 2),
+    "vertex_color": ('>f4', 3),
+    "alpha_vertex": ('>f4', 3),
+    "alpha_texcoord": ('>f4', 2),
+    "alpha_vertex_color": ('>f4', 3),
+    "lightmaps": (LIGHTMAP_DTYPE, None),
+}
+
+class RawCellStore():
+    """Keeps the decompressed bytes of every cell file in a sidecar next to it, so later loads map them into memory instead of inflating the gzip stream again.
+
+    cN.dmg.raw holds the decompressed cell as it is. cN.dmg.toc is a JSON table of contents with the byte offset and size
+    of every section, and the size and mtime of the cell file the sidecar was made from. The table of contents is written last,
+    so a sidecar that is out of date or was only partly written is never used.
+    """
+
+    def open(self, cellpath):
+        try:
+            with open(cellpath + TOC_SUFFIX, "r") as f:
+                toc = json.load(f)
+            stat = os.stat(cellpath)
+            if(toc["version"] != RAW_CELL_VERSION or toc["cell_size"] != stat.st_size or toc["cell_mtime"] != stat.st_mtime_ns):
+                return None
+            with open(cellpath + RAW_SUFFIX, "rb") as f:
+                if(os.fstat(f.fileno()).st_size != toc["raw_size"]):
+                    return None
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError, KeyError):
+            return None
+        return RawCell(buffer, toc["sections"])
+
+    # Writes the sidecar of a cell that was just parsed. Cells can sit in a folder that can't be written to,
+    # in which case they're loaded without a sidecar like before
+    def store(self, cellpath, buffer, sections):
+        try:
+            stat = os.stat(cellpath)
+            toc = {"version": RAW_CELL_VERSION, "cell_size": stat.st_size, "cell_mtime": stat.st_mtime_ns, "raw_size": len(buffer), "sections": sections}
+            write_replace(cellpath + RAW_SUFFIX, "wb", buffer)
+            write_replace(cellpath + TOC_SUFFIX, "w", json.dumps(toc, indent=4))
+        except OSError as error:
+            print("Couldn't write the decompressed copy of " + cellpath + ": " + str(error))
+
+class RawCell():
+    """A decompressed cell mapped into memory, with the byte range of every section in sections as [offset, size]."""
+
+    def __init__(self, buffer, sections):
+        self.buffer = buffer
+        self.sections = sections
+
+    def has_section(self, name):
+        return name in self.sections
+
+    # Returns a stream positioned at the start of a section, or at the start of the cell without a name
+    def get_stream(self, name=None):
+        offset = 0 if name is None else self.sections[name][0]
+        return DataReader(self.buffer, offset)
+
+    # Returns a section listed in SECTION_ARRAYS as a big-endian view straight onto the mapped bytes, nothing is copied
+    def get_view(self, name):
+        offset, size = self.sections[name]
+        dtype, width = SECTION_ARRAYS[name]
+        dtype = np.dtype(dtype)
+        view = np.frombuffer(self.buffer, dtype=dtype, count=size // dtype.itemsize, offset=offset)
+        if(width is not None):
+            view = view.reshape(-1, width)
+        return view
+
+def open_raw_cell(cellpath):
+    return RawCellStore().open(cellpath)
+
+# The file is written under a temporary name first so readers never see a partial file
+def write_replace(filepath, mode, contents):
+    temp_path = filepath + "." + str(os.getpid()) + ".tmp"
+    with open(temp_path, mode) as f:
+        f.write(contents)
+    os.replace(temp_path, filepath)
+
+class SectionRecorder():
+    """Stands in for the stats a cell is parsed with, recording where every stage starts and ends in the stream
+    while passing the stages on to stats."""
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.ranges = {}
+
+    def stage(self, name, stream=None):
+        return RecordedStage(self, name, stream, self.stats.stage(name, stream))
+
+class RecordedStage():
+    def __init__(self, recorder, name, stream, stage):
+        self.recorder = recorder
+        self.name = name
+        self.stream = stream
+        self.stage = stage
+
+    def add_bytes(self, byte_count):
+        self.stage.add_bytes(byte_count)
+
+    def __enter__(self):
+        self.start = self.stream.offset
+        self.stage.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.recorder.ranges[self.name] = [self.start, self.stream.offset]
+        return self.stage.__exit__(exc_type, exc_value, traceback)
+
+# Works out the table of contents of a cell from the stage ranges recorded while it was parsed. The geometry stage is split
+# into the header, the texture tables and the vertex blocks, whose sizes follow from the face and portal counts of the cell.
+# Cells without vertex colors, like those of Alias, don't have their sections
+def get_cell_sections(cell, ranges, buffer):
+    geometry_end = ranges[STAGE_GEOMETRY][1]
+    face_count = cell["total_reg_faces"]
+    alpha_face_count = cell["total_alpha_faces"]
+    has_vertex_colors = "vertex_color" in cell
+    blocks = [("vertex", (face_count + cell["portal_count"] * 2) * 36), ("texcoord", face_count * 24)]
+    if(has_vertex_colors):
+        blocks.append(("vertex_color", face_count * 36))
+    blocks += [("alpha_vertex", alpha_face_count * 36), ("alpha_texcoord", alpha_face_count * 24)]
+    if(has_vertex_colors):
+        blocks.append(("alpha_vertex_color", alpha_face_count * 36))
+
+    # Every texture is a string, a face start and a face count, every alpha texture a string and a face count
+    table_size = sum(10 + len(texture.encode("utf-8")) for texture in cell["texture_list"])
+    table_size += sum(6 + len(texture.encode("utf-8")) for texture in cell["alpha_texture_list"])
+    offset = geometry_end - sum(size for name, size in blocks)
+
+    sections = {}
+    sections["header"] = [0, offset - table_size]
+    sections["texture_tables"] = [offset - table_size, table_size]
+    for name, size in blocks:
+        sections[name] = [offset, size]
+        offset += size
+    for name, stage in [("bsp", STAGE_BSP), ("portals", STAGE_PORTALS), ("light_tree", STAGE_LIGHT_TREE)]:
+        start, end = ranges[stage]
+        sections[name] = [start, end - start]
+    # The lightmaps are an int count followed by that many records
+    start = ranges[STAGE_LIGHTMAPS][0]
+    sections["lightmaps"] = [start + 4, INT.unpack_from(buffer, start)[0] * LIGHTMAP_DTYPE.itemsize]
+    return sections
@@ -0,0 +1,325 @@
+import datetime
+import numpy as np
+from ..data_stream import *
+
+# Reads a whole skin file, returns None when the skin type is unknown
+def get_skin_data(stream):
+    skin_type = stream.read_short()
+
+    data = {}
+
+    if(skin_type == 0):
+        print("Static skin file found, loading...")
+        data = read_static_skin(stream)
+    elif(skin_type == 1):
+        print("Shape skin file found, loading...")
+        data = read_shape_skin(stream)
+    elif(skin_type == 2):
+        print("Bone skin file found, loading...")
+        data = read_bone_skin(stream)
+    else:
+        print("Unknown skin file version found, aborting...")
+        return None
+    return data
+
+def read_skin_core(stream):
+    data = {}
+    data["skin_version"] = stream.read_short()
+    if(data["skin_version"] != 266 and data["skin_version"] < 263):
+        print("Unsupported SkinCore version " + str(data["skin_version"]) + ", aborting...")
+        return {}
+    else:
+        data["timestamp"] = datetime.datetime.fromtimestamp(stream.read_long() / 1000).strftime('%Y-%m-%d %H:%M:%S')
+        data["id"] = stream.read_string()
+        print("Reading skin core for " + data["id"] + "...")
+        data["cylinder_radius"] = stream.read_short()
+        if(data["cylinder_radius"] == 0):
+            data["cylinder_radius"] = 30
+        data["cylinder_height"] = stream.read_short()
+        data["box_width"] = stream.read_short()
+        data["box_height"] = stream.read_short()
+        data["box_depth"] = stream.read_short()
+        data["sphere_radius"] = stream.read_short()
+        if(stream.read_bool()):
+            data["core_scale"] = [stream.read_float(), stream.read_float(), stream.read_float()]
+        else:
+            data["core_scale"] = "null"
+        if(stream.read_bool()):
+            data["core_rotation"] = [stream.read_float(), stream.read_float(), stream.read_float()]
+        else:
+            data["core_rotation"] = "null"
+        if(stream.read_bool()):
+            data["core_translation"] = [stream.read_float(), stream.read_float(), stream.read_float()]
+        else:
+            data["core_translation"] = "null"
+        data["use_alpha_test"] = stream.read_bool()
+        if(data["skin_version"] > 263):
+            data["use_mirroring"] = stream.read_bool()
+        if(data["skin_version"] < 265):
+            thing = stream.read_bool()
+            data["interpolation_type"] = 1 if thing else 2
+        else:
+            data["interpolation_type"] = stream.read_int()
+        mat_count = stream.read_short()
+        data["materials"] = []
+        data["face_indices"] = []
+        data["face_texcoords"] = []
+        data["face_vertex_colors"] = []
+        for i in range(mat_count):
+            data["materials"].append(read_material(stream))
+        # The faces of every material are an (N, 3) array of vertex indices, whose winding is flipped from a, b, c to a, c, b,
+        # and their texcoords an (N * 3, 2) array with a uv per corner in the order they're stored
+        for i in range(mat_count):
+            new_count = stream.read_short()
+            data["face_indices"].append(stream.read_shorts(new_count).reshape(-1, 3)[:, [0, 2, 1]])
+        for i in range(mat_count):
+            new_count = stream.read_short()
+            data["face_texcoords"].append(stream.read_floats(new_count).reshape(-1, 2))
+        if(data["skin_version"] >= 266):
+            for i in range(mat_count):
+                new_count = stream.read_short()
+                face_vertex_colors = []
+                for j in range(0, new_count, 3):
+                    pos = [stream.read_float(), stream.read_float(), stream.read_float()]
+                    face_vertex_colors.append([pos[0], pos[1], pos[2]])
+                data["face_vertex_colors"].append(face_vertex_colors)
+        else:
+            for i in range(mat_count):
+                new_count = stream.read_short()
+                face_vertex_colors = []
+                for j in range(new_count):
+                    face_vertex_colors.append(1.0)
+        contact_point_count = stream.read_short()
+        data["contact_points"] = []
+        if(contact_point_count > 0):
+            data["contact_points"].append(read_contact_point(stream))
+        if(stream.read_bool()):
+            data["lod"] = read_lod(stream)
+
+
+    return data
+
+def read_static_skin(stream):
+    data = read_skin_core(stream)
+    data["skin_type"] = 0
+    data["static_version"] = stream.read_short()
+    if(data["static_version"] != 258):
+        print("Unsupported Static Skin version " + str(data["static_version"]) + ", aborting...")
+        return {}
+    else:
+        print("Reading Static Skin version " + str(data["static_version"]) + "...")
+        vertex_coord_count = stream.read_short()
+        data["vertex_coords"] = stream.read_floats(vertex_coord_count).reshape(1, -1, 3)
+    return data
+
+def read_shape_skin(stream):
+    data = read_skin_core(stream)
+    data["skin_type"] = 1
+    data["shape_version"] = stream.read_short()
+    if(data["shape_version"] != 258):
+        print("Unsupported Shape Skin version " + str(data["shape_version"]) + ", aborting...")
+        return data
+    else:
+        print("Reading Shape Skin version " + str(data["shape_version"]) + "...")
+        # Every frame holds the same vertices, they're stacked into a single (frames, vertices, 3) array.
+        # Empty frames are left out
+        vertex_coord_count = stream.read_short()
+        frames = []
+        for i in range(vertex_coord_count):
+            c = stream.read_short()
+            if(c > 0):
+                frames.append(stream.read_floats(c).reshape(-1, 3))
+        data["vertex_coords"] = np.stack(frames) if len(frames) > 0 else np.empty((0, 0, 3), dtype=np.float32)
+        data["default_fps"] = stream.read_short()
+        animation_count = stream.read_short()
+        if(animation_count > 0):
+            data["animations"] = []
+            for i in range(animation_count):
+                data["animations"].append(read_animation(stream))
+    return data
+
+def read_bone_skin(stream):
+    data = read_skin_core(stream)
+    data["skin_type"] = 2
+    data["bone_version"] = stream.read_short()
+    if(data["bone_version"] != 1):
+        print("Unsupported Bone Skin version " + str(data["bone_version"]) + ", aborting...")
+        return data
+    else:
+        print("Reading Bone Skin version " + str(data["bone_version"]) + "...")
+        vertex_coord_count = stream.read_int()
+        data["vertex_coords"] = stream.read_floats(vertex_coord_count).reshape(1, -1, 3)
+        data["skeleton"] = read_skeleton(stream)
+        data["default_fps"] = stream.read_short()
+        anim_sequence_count = stream.read_short()
+        data["anim_sequences"] = []
+        if(anim_sequence_count > 0):
+            for i in range(anim_sequence_count):
+                data["anim_sequences"].append(read_animation(stream))
+    return data
+
+def read_material(stream):
+    material = {}
+    material["material_version"] = stream.read_short()
+    if(material["material_version"] != 257):
+        print("Unsupported Material version " + str(material["material_version"]) + ", aborting...")
+        return material
+    else:
+        material["name"] = stream.read_string()
+        print("Reading Material " + material["name"] + "...")
+        material["transparent"] = stream.read_bool()
+        material["textured"] = stream.read_bool()
+        if(material["textured"]):
+            material["texture"] = stream.read_string()
+    return material
+
+def read_contact_point(stream):
+    point = {}
+    point["point_version"] = stream.read_short()
+    if(point["point_version"] == 257):
+        point["name"] = stream.read_string()
+        print("Reading Contact Point " + point["name"] + "...")
+        point["vertices"] = [stream.read_short(), stream.read_short(), stream.read_short()]
+        if(stream.read_bool()):
+            point["core_translation"] = [stream.read_float(), stream.read_float(), stream.read_float()]
+        else:
+            point["core_translation"] = "null"
+        if(stream.read_bool()):
+            point["core_rotation"] = [stream.read_float(), stream.read_float(), stream.read_float()]
+        else:
+            point["core_rotation"] = "null"
+        point["sphere_radius"] = stream.read_float()
+        anim_count = stream.read_short()
+        point["has_animation"] = []
+        point["animations"] = []
+        point["rotations"] = []
+        for i in range(anim_count):
+            has_anim = stream.read_bool()
+            point["has_animation"].append(has_anim)
+            if(has_anim):
+                point["animations"].append([stream.read_float(), stream.read_float(), stream.read_float()])
+                point["rotations"].append([stream.read_float(), stream.read_float(), stream.read_float()])
+    return point
+
+def read_lod(stream):
+    lod = {}
+    lod["lod_version"] = stream.read_short()
+    if(lod["lod_version"] != 258 and lod["lod_version"] != 257):
+        print("Unsupported LOD version " + str(lod["lod_version"]) + ", aborting...")
+        return {}
+    else:
+        print("Reading LOD with version " + str(lod["lod_version"]) + "...")
+        lod["start_distance"] = stream.read_float()
+        lod["end_distance"] = stream.read_float()
+        lod["end_level"] = stream.read_short()
+        lod["start_level"] = stream.read_short()
+        if(lod["lod_version"] > 257):
+            lod["frame_used"] = stream.read_short()
+        texcoord_count = stream.read_short()
+        for i in range(texcoord_count):
+            lod["face_texcoords"].append(stream.read_float())
+        face_vert_count = stream.read_char()
+        for i in range(face_vert_count):
+            inner_count = stream.read_char()
+            thing = []
+            for j in range(inner_count):
+                thing.append(stream.read_char())
+            lod["face_indices"].append(thing)
+        face_ind_count = stream.read_short()
+        for i in range(face_ind_count):
+            inner_count = stream.read_short()
+            thing = []
+            for j in range(inner_count):
+                thing.append(stream.read_short())
+            lod["face_indices"].append(thing)
+        lod_level_count = stream.read_short()
+        for i in range(lod_level_count):
+            lod["lod_levels"].append(read_lod_level(stream, i))
+    return lod
+
+def read_lod_level(stream, num):
+    level = {}
+    level["lod_level_version"] = stream.read_short()
+    if(level["lod_level_version"] != 257):
+        print("Unsupported LODLevel version " + str(level["lod_level_version"]) + ", aborting...")
+        return {}
+    else:
+        print("Reading LODLevel with version " + str(level["lod_level_version"]) + "...")
+        level["level"] = num
+        count = stream.read_short()
+        if(count != 0):
+            level["levels"] = []
+            for i in range(count):
+                lvl = {}
+                lvl["a"] = stream.read_byte()
+                lvl["b"] = stream.read_short()
+                lvl["c"] = stream.read_short()
+                if(lvl["a"] & 1 != 0):
+                    lvl["aa"] = stream.read_short()
+                    lvl["bb"] = [stream.read_float(), stream.read_float()]
+                if(lvl["a"] & 2 != 0):
+                    lvl["aa"] = stream.read_short()
+                    lvl["cc"] = stream.read_char()
+                level["levels"].append(lvl)
+    return level
+
+def read_animation(stream):
+    anim = {}
+    anim["animation_version"] = stream.read_short()
+    if(anim["animation_version"] != 258):
+        print("Unsupported AnimationSequence version " + str(anim["animation_version"]) + ", aborting...")
+        return {}
+    else:
+        anim["name"] = stream.read_string()
+        anim["description"] = stream.read_string()
+        print("Reading AnimationSequence " + anim["name"] + " (" + anim["description"] + ")...")
+        anim["from_frame"] = stream.read_short()
+        anim["to_frame"] = stream.read_short()
+        anim["front_speed"] = stream.read_float()
+        anim["side_speed"] = stream.read_float()
+        anim["eye_level"] = stream.read_short()
+        anim["camera_level"] = stream.read_short()
+        anim["framerate"] = stream.read_short()
+    return anim
+
+def read_skeleton(stream):
+    skeleton = {}
+    bone_count = stream.read_short()
+    print("Reading skeleton with " + str(bone_count) + " bones...")
+    skeleton["bones"] = []
+    for i in range(bone_count):
+        skeleton["bones"].append(read_bone(stream))
+    return skeleton
+
+def read_bone(stream):
+    bone = {}
+    bone["id"] = stream.read_int()
+    bone["name"] = stream.read_string()
+    bone_weight_count = stream.read_short()
+    bone["weights"] = []
+    for i in range(bone_weight_count):
+        bone["weights"].append(stream.read_float())
+    vert_count = stream.read_short()
+    bone["vertices"] = []
+    for i in range(vert_count):
+        bone["vertices"].append(stream.read_int())
+    bone["scale"] = [stream.read_float(), stream.read_float(), stream.read_float()]
+    bone["rotation"] = [stream.read_float(), stream.read_float(), stream.read_float(), stream.read_float()]
+    bone["translation"] = [stream.read_float(), stream.read_float(), stream.read_float()]
+    child_count = stream.read_short()
+    bone["children"] = []
+    for i in range(child_count):
+        bone["children"].append(read_bone(stream))
+    bone["animation"] = read_bone_animation(stream)
+    return bone
+
+# Every track is an array with a key per row, scales and translations are (N, 3) and rotations (N, 4) x, y, z, w quaternions
+def read_bone_animation(stream):
+    bone_anim = {}
+    scale_count = stream.read_short()
+    bone_anim["scales"] = stream.read_floats(scale_count * 3).reshape(-1, 3)
+    rotation_count = stream.read_short()
+    bone_anim["rotations"] = stream.read_floats(rotation_count * 4).reshape(-1, 4)
+    translation_count = stream.read_short()
+    bone_anim["translations"] = stream.read_floats(translation_count * 3).reshape(-1, 3)
+    return bone_anim
@@ -0,0 +1,223 @@
+import struct
+from array import array
+import numpy as np
+from ..data_stream import *
+
+# A BSP node is its plane (4 floats), a short polygon count, the polygons as (int vertex index, short texture index),
+# and then the int front and back node indices followed by two bytes
+BSP_NODE_HEADER_SIZE = 18
+BSP_POLYGON_SIZE = 6
+BSP_NODE_TAIL_SIZE = 10
+BSP_POLYGON_DTYPE = np.dtype([("vertex_index", '>u4'), ("tex_index", '>u2')])
+BSP_NODE_TAIL_DTYPE = np.dtype([("front", '>i4'), ("back", '>i4'), ("i1", 'u1'), ("i2", 'u1')])
+
+# A portal vis node is its own value and its child count, after the name on Versusville
+PORTAL_VIS_NODE = struct.Struct('>II')
+
+# The 8 child flags of a light tree node without children
+NO_LIGHT_QUADS = bytes(8)
+
+# Reads node_count BSP nodes into typed arrays. The polygons of every node are stored in CSR layout,
+# the polygons of node i are vertex_index[poly_offsets[i]:poly_offsets[i + 1]] and the same slice of tex_index
+def read_bsp_nodes(stream, node_count):
+    # Nodes vary in size, so a first pass only reads the polygon counts to find where every node starts
+    buffer = stream.buffer
+    offset = stream.offset
+    starts = []
+    poly_counts = []
+    for i in range(node_count):
+        poly_count = SHORT.unpack_from(buffer, offset + 16)[0]
+        starts.append(offset)
+        poly_counts.append(poly_count)
+        offset += BSP_NODE_HEADER_SIZE + poly_count * BSP_POLYGON_SIZE + BSP_NODE_TAIL_SIZE
+    stream.offset = offset
+
+    # Then every column is gathered straight out of the buffer in one go
+    raw = np.frombuffer(buffer, dtype=np.uint8)
+    starts = np.array(starts, dtype=np.int64)
+    poly_counts = np.array(poly_counts, dtype=np.int64)
+    poly_offsets = np.zeros(node_count + 1, dtype=np.int64)
+    np.cumsum(poly_counts, out=poly_offsets[1:])
+    poly_starts = np.repeat(starts + BSP_NODE_HEADER_SIZE - poly_offsets[:-1] * BSP_POLYGON_SIZE, poly_counts) + np.arange(poly_offsets[-1]) * BSP_POLYGON_SIZE
+    tail_starts = starts + BSP_NODE_HEADER_SIZE + poly_counts * BSP_POLYGON_SIZE
+
+    nodes = {}
+    nodes["ppe"] = gather_records(raw, starts, np.dtype('>f4'), 4).astype(np.float32)
+    nodes["poly_offsets"] = poly_offsets.astype(np.int32)
+    polygons = gather_records(raw, poly_starts, BSP_POLYGON_DTYPE)
+    nodes["vertex_index"] = polygons["vertex_index"].astype(np.uint32)
+    nodes["tex_index"] = polygons["tex_index"].astype(np.uint16)
+    tails = gather_records(raw, tail_starts, BSP_NODE_TAIL_DTYPE)
+    nodes["front"] = tails["front"].astype(np.int32)
+    nodes["back"] = tails["back"].astype(np.int32)
+    nodes["i1"] = tails["i1"].copy()
+    nodes["i2"] = tails["i2"].copy()
+    return nodes
+
+# Copies count values of dtype from every start offset in raw, returning an array of shape (len(starts), count)
+# or (len(starts),) when count is 1
+def gather_records(raw, starts, dtype, count=1):
+    size = dtype.itemsize * count
+    records = raw[starts[:, None] + np.arange(size)].view(dtype)
+    if(count == 1):
+        return records.reshape(-1)
+    return records.reshape(-1, count)
+
+# Reads a portal vis tree into a flat node table, walking it with an explicit stack instead of recursing.
+# Nodes are numbered in the order they're stored, so node 0 is the root and every parent comes before its children.
+# The children of node i are children[child_offsets[i]:child_offsets[i + 1]], a is the node's own value and
+# b the value stored in front of it in its parent's child list (0 for the root).
+# Versusville nodes can have a name, which is None when they don't
+def read_portal_vis_nodes(stream, has_names):
+    buffer = stream.buffer
+    offset = stream.offset
+    parent = array('i')
+    a = array('I')
+    b = array('I')
+    names = []
+    # The open nodes and how many of their children are still to be read
+    stack_nodes = array('i')
+    stack_remaining = array('I')
+    parent_index = -1
+    node_b = 0
+    while True:
+        if(has_names):
+            if(INT.unpack_from(buffer, offset)[0] > 0):
+                length = SHORT.unpack_from(buffer, offset + 4)[0]
+                names.append(str(buffer[offset + 6:offset + 6 + length], "utf-8"))
+                offset += 6 + length
+            else:
+                names.append(None)
+                offset += 4
+        node_a, child_count = PORTAL_VIS_NODE.unpack_from(buffer, offset)
+        offset += PORTAL_VIS_NODE.size
+        stack_nodes.append(len(parent))
+        stack_remaining.append(child_count)
+        parent.append(parent_index)
+        a.append(node_a)
+        b.append(node_b)
+
+        while len(stack_nodes) > 0 and stack_remaining[-1] == 0:
+            stack_nodes.pop()
+            stack_remaining.pop()
+        if(len(stack_nodes) == 0):
+            break
+        stack_remaining[-1] -= 1
+        parent_index = stack_nodes[-1]
+        node_b = INT.unpack_from(buffer, offset)[0]
+        offset += 4
+    stream.offset = offset
+
+    nodes = get_child_ranges(np.frombuffer(parent, dtype=np.int32).copy())
+    nodes["a"] = np.frombuffer(a, dtype=np.uint32).copy()
+    nodes["b"] = np.frombuffer(b, dtype=np.uint32).copy()
+    if(has_names):
+        nodes["name"] = names
+    return nodes
+
+# Reads a light tree into a flat node table, walking it with an explicit stack instead of recursing.
+# The tree is an octree, bit k of child_mask is set when child slot k holds a node, and the children of node i
+# are children[child_offsets[i]:child_offsets[i + 1]] in slot order.
+# The lights of node i are light_list[light_offsets[i]:light_offsets[i + 1]] and its midpoint is mid[i]
+def read_light_tree_nodes(stream):
+    buffer = stream.buffer
+    offset = stream.offset
+    parent = array('i')
+    child_mask = bytearray()
+    light_offsets = array('i', [0])
+    # The light lists and midpoints are copied as they're stored and converted from big endian at the end
+    light_bytes = bytearray()
+    mid_bytes = bytearray()
+    # The open nodes and the next of their 8 child slots to read
+    stack_nodes = array('i')
+    stack_slots = array('B')
+    parent_index = -1
+    while True:
+        light_count = SHORT.unpack_from(buffer, offset)[0]
+        offset += 2
+        light_bytes += buffer[offset:offset + light_count * 2]
+        offset += light_count * 2
+        light_offsets.append(light_offsets[-1] + light_count)
+        mid_bytes += buffer[offset:offset + 12]
+        offset += 12
+        stack_nodes.append(len(parent))
+        stack_slots.append(0)
+        parent.append(parent_index)
+        child_mask.append(0)
+
+        # Moves on to the next child that is present, closing every node that has no child slots left.
+        # Most nodes are leaves, so the rest of a node's flags are checked in one go before they're read one by one
+        found_child = False
+        while len(stack_nodes) > 0:
+            slot = stack_slots[-1]
+            if(buffer[offset:offset + 8 - slot] == NO_LIGHT_QUADS[slot:]):
+                offset += 8 - slot
+                stack_nodes.pop()
+                stack_slots.pop()
+                continue
+            while slot < 8 and buffer[offset] != 1:
+                offset += 1
+                slot += 1
+            if(slot == 8):
+                stack_nodes.pop()
+                stack_slots.pop()
+                continue
+            offset += 1
+            stack_slots[-1] = slot + 1
+            child_mask[stack_nodes[-1]] |= 1 << slot
+            found_child = True
+            break
+        if(found_child == False):
+            break
+        parent_index = stack_nodes[-1]
+    stream.offset = offset
+
+    nodes = get_child_ranges(np.frombuffer(parent, dtype=np.int32).copy())
+    nodes["child_mask"] = np.frombuffer(child_mask, dtype=np.uint8).copy()
+    nodes["light_offsets"] = np.frombuffer(light_offsets, dtype=np.int32).copy()
+    nodes["light_list"] = np.frombuffer(light_bytes, dtype='>u2').astype(np.uint16)
+    nodes["mid"] = np.frombuffer(mid_bytes, dtype='>u4').astype(np.uint32).reshape(-1, 3)
+    return nodes
+
+# Groups the nodes by their parent. Parents always come before their children, and siblings are stored in order,
+# so a stable sort keeps every node's children in the order they were read
+def get_child_ranges(parent):
+    node_count = len(parent)
+    nodes = {}
+    nodes["parent"] = parent
+    child_offsets = np.zeros(node_count + 1, dtype=np.int32)
+    np.cumsum(np.bincount(parent[1:], minlength=node_count), out=child_offsets[1:])
+    nodes["child_offsets"] = child_offsets
+    nodes["children"] = (np.argsort(parent[1:], kind='stable') + 1).astype(np.int32)
+    return nodes
+
+# Builds the nested dicts read_portal_vis_node used to return, from the last node back to the root so
+# every node's children already exist when it's built
+def get_portal_vis_node_view(nodes):
+    views = [None] * len(nodes["parent"])
+    for i in range(len(views) - 1, -1, -1):
+        view = {}
+        if("name" in nodes and nodes["name"][i] is not None):
+            view["name"] = nodes["name"][i]
+        view["a"] = int(nodes["a"][i])
+        children = nodes["children"][nodes["child_offsets"][i]:nodes["child_offsets"][i + 1]]
+        view["b"] = [int(nodes["b"][child]) for child in children]
+        view["c"] = [views[child] for child in children]
+        views[i] = view
+    return views[0]
+
+# Builds the nested dicts read_light_tree used to return
+def get_light_tree_view(nodes):
+    views = [None] * len(nodes["parent"])
+    for i in range(len(views) - 1, -1, -1):
+        view = {}
+        light_list = nodes["light_list"][nodes["light_offsets"][i]:nodes["light_offsets"][i + 1]]
+        view["light_count"] = len(light_list)
+        view["light_list"] = [int(light) for light in light_list]
+        view["x_mid"] = int(nodes["mid"][i][0])
+        view["y_mid"] = int(nodes["mid"][i][1])
+        view["z_mid"] = int(nodes["mid"][i][2])
+        children = nodes["children"][nodes["child_offsets"][i]:nodes["child_offsets"][i + 1]]
+        view["light_quads"] = [views[child] for child in children]
+        views[i] = view
+    return views[0]
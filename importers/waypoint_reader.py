@@ -0,0 +1,91 @@
+import numpy as np
+from ..data_stream import *
+from .tree_reader import gather_records
+
+# The names of the waypoint type flags, in bit order
+WAYPOINT_FLAG_NAMES = ["NEVER_LINK", "OBSTACLE", "GOAL", "FINISH", "DEPART", "DESTINATION", "DETOUR", "NEVER_COMPILE", "SECTOR_NODE"]
+WAYPOINT_FLAG_MASK = (1 << len(WAYPOINT_FLAG_NAMES)) - 1
+
+def get_flag_string(type_flags):
+    names = [WAYPOINT_FLAG_NAMES[bit] for bit in range(len(WAYPOINT_FLAG_NAMES)) if type_flags & (1 << bit)]
+    if(len(names) == 0):
+        return "<none>"
+    return "| ".join(names)
+
+# The flag string of every combination of the named flags, looked up with type_flags & WAYPOINT_FLAG_MASK
+WAYPOINT_FLAG_STRINGS = [get_flag_string(type_flags) for type_flags in range(WAYPOINT_FLAG_MASK + 1)]
+
+# A waypoint is the fields in front of its linked indices, then the linked indices as an int count and that many ints
+# from version 801, and then the fields after them. Both parts are fixed size for a given version
+def get_waypoint_dtypes(version):
+    head = [("position", '>f4', 3), ("cell_id", '>u4')]
+    if(version > 793):
+        head.append(("sequence", '>u4'))
+    tail = []
+    if(version > 802):
+        tail.append(("group_id", '>u4'))
+    if(version > 804):
+        tail += [("leading_id", '>u4'), ("trailing_id", '>u4'), ("racing_offset", '>f4'), ("overtaking_offset", '>f4')]
+    tail.append(("type_flags", '>u8'))
+    return np.dtype(head), np.dtype(tail)
+
+# Reads waypoint_count waypoints into one array per field, in the order they're stored.
+# The linked indices of waypoint i are linked_indices[link_offsets[i]:link_offsets[i + 1]].
+# Fields the version doesn't have are left out, like they were when every waypoint was a dict
+def read_waypoints(stream, version, waypoint_count):
+    head_dtype, tail_dtype = get_waypoint_dtypes(version)
+    has_links = version > 800
+
+    # Waypoints vary in size once they have linked indices, so a first pass only reads the link counts
+    buffer = stream.buffer
+    offset = stream.offset
+    starts = []
+    link_counts = []
+    for i in range(waypoint_count):
+        starts.append(offset)
+        offset += head_dtype.itemsize
+        link_count = 0
+        if(has_links):
+            link_count = INT.unpack_from(buffer, offset)[0]
+            offset += 4 + link_count * 4
+        link_counts.append(link_count)
+        offset += tail_dtype.itemsize
+    stream.offset = offset
+
+    raw = np.frombuffer(buffer, dtype=np.uint8)
+    starts = np.array(starts, dtype=np.int64)
+    link_counts = np.array(link_counts, dtype=np.int64)
+    link_offsets = np.zeros(waypoint_count + 1, dtype=np.int64)
+    np.cumsum(link_counts, out=link_offsets[1:])
+    link_list_starts = starts + head_dtype.itemsize + 4
+    tail_starts = starts + head_dtype.itemsize
+    if(has_links):
+        tail_starts += 4 + link_counts * 4
+
+    waypoints = {}
+    head = gather_records(raw, starts, head_dtype)
+    tail = gather_records(raw, tail_starts, tail_dtype)
+    waypoints["position"] = head["position"].astype(np.float32)
+    waypoints["cell_id"] = head["cell_id"].astype(np.uint32)
+    if(version > 793):
+        waypoints["sequence"] = head["sequence"].astype(np.uint32)
+    if(has_links):
+        link_starts = np.repeat(link_list_starts - link_offsets[:-1] * 4, link_counts) + np.arange(link_offsets[-1]) * 4
+        waypoints["link_offsets"] = link_offsets.astype(np.int32)
+        waypoints["linked_indices"] = gather_records(raw, link_starts, np.dtype('>u4')).astype(np.uint32)
+    for name in tail_dtype.names:
+        waypoints[name] = tail[name].astype(tail_dtype[name].newbyteorder('='))
+    waypoints["type_flag_string"] = [WAYPOINT_FLAG_STRINGS[type_flags & WAYPOINT_FLAG_MASK] for type_flags in waypoints["type_flags"].tolist()]
+    return waypoints
+
+# Returns the links between waypoints as an (N, 2) array of waypoint index pairs, each link is only listed once.
+# Links to waypoints that don't exist are left out
+def get_waypoint_edges(waypoints):
+    waypoint_count = len(waypoints["position"])
+    if("link_offsets" not in waypoints):
+        return np.empty((0, 2), dtype=np.int32)
+    sources = np.repeat(np.arange(waypoint_count, dtype=np.int64), np.diff(waypoints["link_offsets"]))
+    targets = waypoints["linked_indices"].astype(np.int64)
+    edges = np.stack([np.minimum(sources, targets), np.maximum(sources, targets)], axis=1)
+    edges = edges[(targets < waypoint_count) & (sources != targets)]
+    return np.unique(edges, axis=0).astype(np.int32)
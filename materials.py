@@ -0,0 +1,74 @@
+import bpy
+import os
+
+class MaterialCache():
+    """Reuses the materials and images of textures that were already imported.
+
+    Materials are keyed by their resolved texture path and whether they use the alpha (CLIP) variant.
+    A cache can live for a single import or for the whole Blender session.
+    """
+
+    def __init__(self):
+        self.materials = {}
+        self.images = {}
+        self.material_hits = 0
+        self.material_misses = 0
+        self.image_hits = 0
+        self.image_misses = 0
+
+    def get_material(self, name, image_path, alpha):
+        key = (name if image_path is None else resolve_path(image_path), alpha)
+        material = self.materials.get(key)
+        if(material is not None and is_alive(material, bpy.data.materials)):
+            self.material_hits += 1
+            return material
+        self.material_misses += 1
+        image = None if image_path is None else self.get_image(image_path)
+        material = create_texture_material(name, image, alpha)
+        self.materials[key] = material
+        return material
+
+    def get_image(self, image_path):
+        key = resolve_path(image_path)
+        image = self.images.get(key)
+        if(image is not None and is_alive(image, bpy.data.images)):
+            self.image_hits += 1
+            return image
+        self.image_misses += 1
+        image = bpy.data.images.load(image_path, check_existing=True)
+        self.images[key] = image
+        return image
+
+    def report(self):
+        print("Material cache: " + str(self.material_hits) + " hits, " + str(self.material_misses) + " misses")
+        print("Image cache: " + str(self.image_hits) + " hits, " + str(self.image_misses) + " misses")
+
+# Shared by imports that opt into reusing materials across the Blender session
+SESSION_CACHE = MaterialCache()
+
+def resolve_path(filepath):
+    return os.path.normcase(os.path.normpath(os.path.abspath(filepath)))
+
+# Cached datablocks can be deleted by the user between imports
+def is_alive(datablock, collection):
+    try:
+        return collection.get(datablock.name) == datablock
+    except ReferenceError:
+        return False
+
+# Alpha textures get a material that clips on the texture's alpha channel
+def create_texture_material(name, image, alpha):
+    material = bpy.data.materials.new(name=name)
+    material.diffuse_color = (1, 1, 1, 1)
+    if(alpha):
+        material.blend_method = 'CLIP'
+        material.shadow_method = 'CLIP'
+    material.use_nodes = True
+    if(image is not None):
+        mat_principled_bsdf = material.node_tree.nodes.get("Principled BSDF")
+        tex_node = material.node_tree.nodes.new("ShaderNodeTexImage")
+        tex_node.image = image
+        material.node_tree.links.new(tex_node.outputs[0], mat_principled_bsdf.inputs[0])
+        if(alpha):
+            material.node_tree.links.new(tex_node.outputs["Alpha"], mat_principled_bsdf.inputs["Alpha"])
+    return material
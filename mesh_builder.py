@@ -0,0 +1,133 @@
+import bpy
+import numpy as np
+
+# Blender stores a vertex position as 3 floats and an edge as 2 ints, in memory and in .blend files
+VERTEX_BYTES = 12
+EDGE_BYTES = 8
+
+class VertexWelder():
+    """Merges the vertices of triangle meshes that are within distance of each other, keeping count of what was merged.
+
+    Positions are snapped to a grid of distance sized cells and vertices in the same cell are merged with a sort based
+    unique pass, so vertices closer than distance that fall either side of a cell border are left apart.
+    Texcoords stay per loop, so UV seams survive the merge. Faces that end up with fewer than 3 vertices are removed.
+    """
+
+    def __init__(self, distance):
+        self.distance = distance
+        self.vertices_before = 0
+        self.vertices_after = 0
+        self.edges_before = 0
+        self.edges_after = 0
+        self.faces_removed = 0
+
+    # Takes an (N, 3) array holding three vertices per face and returns the merged positions,
+    # the vertex index of every loop of the faces that are kept, and a mask of the faces that are kept
+    def weld(self, vertices):
+        keys = np.floor(vertices / self.distance + 0.5).astype(np.int64)
+        unique_keys, first, loop_vertices = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        corners = loop_vertices.reshape(-1, 3)
+        kept_faces = (corners[:, 0] != corners[:, 1]) & (corners[:, 1] != corners[:, 2]) & (corners[:, 2] != corners[:, 0])
+        corners = corners[kept_faces]
+
+        # Vertices that were only used by removed faces are left out
+        used = np.zeros(len(first), dtype=bool)
+        used[corners.ravel()] = True
+        remap = np.cumsum(used) - 1
+        positions = vertices[first[used]]
+        corners = remap[corners]
+
+        self.vertices_before += len(vertices)
+        self.vertices_after += len(positions)
+        self.edges_before += len(vertices)
+        self.edges_after += count_edges(corners)
+        self.faces_removed += len(kept_faces) - len(corners)
+        return positions, corners.ravel().astype(np.int32), kept_faces
+
+    def saved_bytes(self):
+        return (self.vertices_before - self.vertices_after) * VERTEX_BYTES + (self.edges_before - self.edges_after) * EDGE_BYTES
+
+    def report(self):
+        print("Welded " + str(self.vertices_before) + " vertices into " + str(self.vertices_after) + " and " + str(self.edges_before) + " edges into " + str(self.edges_after) + ", removing " + str(self.faces_removed) + " collapsed faces")
+        print("About %.1f KB less vertex and edge data in memory and in the .blend file" % (self.saved_bytes() / 1024))
+
+# Counts the distinct edges of triangles given as an (N, 3) array of vertex indices
+def count_edges(corners):
+    edges = np.concatenate([corners[:, [0, 1]], corners[:, [1, 2]], corners[:, [2, 0]]])
+    edges.sort(axis=1)
+    return len(np.unique(edges, axis=0))
+
+# Builds a mesh of triangles from flat buffers. vertices is an (N, 3) array holding three
+# vertices per face and texcoords an (N, 2) array with one uv per loop, since loops map one to one onto vertices.
+# material_indices optionally holds the material slot of every face.
+# Without a welder every face gets its own three vertices, with one the vertices are merged by VertexWelder.weld
+def create_triangle_mesh(name, vertices, texcoords, material_indices=None, welder=None):
+    vertices = np.ascontiguousarray(vertices, dtype=np.float32).reshape(-1, 3)
+    texcoords = np.ascontiguousarray(texcoords, dtype=np.float32).reshape(-1, 2)
+    if(welder is not None):
+        vertices, loop_vertices, kept_faces = welder.weld(vertices)
+        texcoords = np.ascontiguousarray(texcoords.reshape(-1, 3, 2)[kept_faces]).reshape(-1, 2)
+        if(material_indices is not None):
+            material_indices = np.asarray(material_indices)[kept_faces]
+    else:
+        loop_vertices = np.arange(len(vertices), dtype=np.int32)
+    return create_indexed_triangle_mesh(name, vertices, loop_vertices, texcoords, material_indices)
+
+# Builds a mesh of triangles that share their vertices. loop_vertices holds the vertex index of every loop, three per face,
+# and texcoords an (N, 2) array with one uv per loop. material_indices optionally holds the material slot of every face
+def create_indexed_triangle_mesh(name, vertices, loop_vertices, texcoords, material_indices=None):
+    vertices = np.ascontiguousarray(vertices, dtype=np.float32).reshape(-1, 3)
+    loop_vertices = np.ascontiguousarray(loop_vertices, dtype=np.int32).reshape(-1)
+    texcoords = np.ascontiguousarray(texcoords, dtype=np.float32).reshape(-1, 2)
+    loop_count = len(loop_vertices)
+    face_count = loop_count // 3
+
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set("co", vertices.ravel())
+    mesh.loops.add(loop_count)
+    mesh.loops.foreach_set("vertex_index", loop_vertices)
+    mesh.polygons.add(face_count)
+    mesh.polygons.foreach_set("loop_start", np.arange(0, loop_count, 3, dtype=np.int32))
+    # Since Blender 4.0 the loop totals are derived from loop_start and can't be set
+    if(bpy.app.version < (4, 0, 0)):
+        mesh.polygons.foreach_set("loop_total", np.full(face_count, 3, dtype=np.int32))
+    if(material_indices is not None):
+        mesh.polygons.foreach_set("material_index", np.ascontiguousarray(material_indices, dtype=np.int32))
+
+    uv_layer = mesh.uv_layers.new(name="UVMap")
+    mesh.uv_layers.active = uv_layer
+    uv_layer.data.foreach_set("uv", texcoords.ravel())
+
+    mesh.update(calc_edges=True)
+    return mesh
+
+# Returns the indices of the vertices that faces, an (N, 3) array of vertex indices, use in ascending order,
+# and the faces with their indices remapped onto just those vertices
+def get_used_vertices(faces):
+    used, remapped = np.unique(faces, return_inverse=True)
+    return used, remapped.reshape(-1, 3)
+
+# Builds a mesh of loose vertices joined by edges, without any faces. edges is an (M, 2) array of vertex indices and
+# attributes maps names to one value per vertex, stored as float attributes for float arrays and int attributes otherwise
+def create_point_mesh(name, vertices, edges, attributes={}):
+    vertices = np.ascontiguousarray(vertices, dtype=np.float32).reshape(-1, 3)
+    edges = np.ascontiguousarray(edges, dtype=np.int32).reshape(-1, 2)
+
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set("co", vertices.ravel())
+    mesh.edges.add(len(edges))
+    mesh.edges.foreach_set("vertices", edges.ravel())
+
+    for attribute_name in attributes:
+        values = attributes[attribute_name]
+        if(np.issubdtype(values.dtype, np.floating)):
+            attribute = mesh.attributes.new(name=attribute_name, type='FLOAT', domain='POINT')
+            attribute.data.foreach_set("value", np.ascontiguousarray(values, dtype=np.float32))
+        else:
+            attribute = mesh.attributes.new(name=attribute_name, type='INT', domain='POINT')
+            attribute.data.foreach_set("value", np.ascontiguousarray(values).astype(np.int32))
+
+    mesh.update()
+    return mesh
@@ -0,0 +1,83 @@
+import numpy as np
+
+# Opaque faces have their texcoords stored in a different corner order than their vertices
+OPAQUE_TEXCOORD_ORDER = [0, 2, 1]
+ALPHA_TEXCOORD_ORDER = [0, 1, 2]
+
+# Splits the faces of a cell into one group per opaque and alpha texture.
+# The faces of every texture follow each other, so every group is a slice of the vertices
+def get_texture_groups(cell):
+    groups = []
+
+    vertices = cell["vertex"]
+    face_count = len(vertices) // 3
+    texture_count = len(cell["texture_list"])
+    offsets = get_opaque_face_offsets(cell["face_start"], texture_count, face_count)
+    texcoords = get_face_texcoords(cell["texcoord"], face_count, OPAQUE_TEXCOORD_ORDER)
+    for i in range(texture_count):
+        face_range = slice(offsets[i] * 3, offsets[i + 1] * 3)
+        groups.append(create_texture_group(cell["texture_list"][i], False, vertices[face_range], texcoords[face_range]))
+
+    alpha_vertices = cell["alpha_vertex"]
+    alpha_face_count = len(alpha_vertices) // 3
+    alpha_texture_count = len(cell["alpha_texture_list"])
+    offsets = get_alpha_face_offsets(cell["alpha_face_count"], alpha_texture_count, alpha_face_count)
+    alpha_texcoords = get_face_texcoords(cell["alpha_texcoord"], alpha_face_count, ALPHA_TEXCOORD_ORDER)
+    for i in range(alpha_texture_count):
+        face_range = slice(offsets[i] * 3, offsets[i + 1] * 3)
+        groups.append(create_texture_group(cell["alpha_texture_list"][i], True, alpha_vertices[face_range], alpha_texcoords[face_range]))
+
+    return groups
+
+# Returns where the faces of every opaque texture start and end, as texture_count + 1 face offsets.
+# A texture starts at its face_start, but only when that's after where the texture before it started,
+# otherwise it and every texture after it are left empty and the rest of the faces stay with the texture before
+def get_opaque_face_offsets(face_start, texture_count, face_count):
+    offsets = [0]
+    for i in range(1, texture_count):
+        if(face_start[i] >= face_count or (i > 1 and face_start[i] <= offsets[-1])):
+            break
+        offsets.append(face_start[i])
+    return close_face_offsets(offsets, texture_count, face_count)
+
+# Like get_opaque_face_offsets for the alpha textures, which are only stored by their face count.
+# The first texture gets its own count, but every texture after it gets the count of the texture after it
+# and the last texture gets the rest of the faces. A texture whose count is 0 keeps the rest of the faces too
+def get_alpha_face_offsets(alpha_face_count, texture_count, face_count):
+    offsets = [0]
+    if(texture_count == 0):
+        return offsets
+    next_start = alpha_face_count[0]
+    while len(offsets) < texture_count and next_start < face_count and (next_start > offsets[-1] or len(offsets) == 1):
+        offsets.append(next_start)
+        if(len(offsets) < texture_count):
+            next_start += alpha_face_count[len(offsets)]
+    return close_face_offsets(offsets, texture_count, face_count)
+
+# The faces after the last texture that was started all belong to it, and the textures after it are empty
+def close_face_offsets(offsets, texture_count, face_count):
+    return offsets + [face_count] * (texture_count + 1 - len(offsets))
+
+# Reorders the corners of the texcoords of every face, the faces without texcoords get (0, 0) for all three
+def get_face_texcoords(texcoords, face_count, order):
+    texcoords = np.asarray(texcoords, dtype=np.float32).reshape(-1, 2)
+    indices = (np.arange(face_count)[:, None] * 3 + order).ravel()
+    indices[indices >= len(texcoords)] = len(texcoords)
+    return np.concatenate([texcoords, np.zeros((1, 2), dtype=np.float32)])[indices]
+
+def create_texture_group(texture, alpha, vertices, texcoords):
+    group = {}
+    group["name"] = texture.split('\\')[-1].split('.')[0]
+    group["texture"] = texture
+    group["alpha"] = alpha
+    group["vertex"] = np.array(vertices, dtype=np.float32).reshape(-1, 3)
+    group["texcoord"] = np.array(texcoords, dtype=np.float32).reshape(-1, 2)
+    return group
+
+# Reduces a parsed cell to the texture groups its meshes are built from. Cells can be prepared by the worker
+# that parsed them, which then only has to send the groups back instead of the whole cell
+def prepare_cell_groups(cell):
+    prepared = {}
+    prepared["name"] = cell["name"]
+    prepared["groups"] = get_texture_groups(cell)
+    return prepared
@@ -0,0 +1,110 @@
+import os
+import posixpath
+
+# Prefetched texture files are read in blocks of this many bytes
+PREFETCH_BLOCK_SIZE = 1 << 20
+
+# Locales and skins keep their textures in a texture folder two levels above them
+TEXTURE_FOLDER_NAME = "texture"
+
+class TextureResolver():
+    """Finds the files of the textures named by a locale or skin in an index of the texture folder.
+
+    The folder is scanned once when the resolver is created, after that every texture is looked up in a dict.
+    Texture names are written with Windows separators and don't always match the case of the files,
+    so the index is keyed by the lowercased path relative to the folder with forward slashes.
+    Names that aren't found by their path fall back to their file name, as long as only one file in the folder has it.
+    """
+
+    def __init__(self, texture_folder):
+        self.texture_folder = texture_folder
+        self.files = {}
+        self.file_names = {}
+        self.stat_calls = 0
+        self.resolved = 0
+        self.missing = set()
+        self.prefetched = set()
+        self.prefetched_bytes = 0
+        if(texture_folder is not None):
+            self.scan(texture_folder)
+
+    def scan(self, texture_folder):
+        folders = [texture_folder]
+        while len(folders) > 0:
+            folder = folders.pop()
+            self.stat_calls += 1
+            try:
+                entries = list(os.scandir(folder))
+            except OSError:
+                continue
+            for entry in entries:
+                if(entry.is_dir()):
+                    folders.append(entry.path)
+                    continue
+                key = normalize_texture_name(os.path.relpath(entry.path, texture_folder))
+                self.files[key] = entry.path
+                name = key.rsplit("/", 1)[-1]
+                # Names that are in more than one folder can't be resolved by the name alone
+                self.file_names[name] = None if name in self.file_names else entry.path
+
+    def found_folder(self):
+        return self.texture_folder is not None
+
+    # Returns the path of the file of a texture, or None when it isn't in the texture folder
+    def resolve(self, texture):
+        filepath = self.find(texture)
+        if(filepath is None):
+            self.missing.add(texture)
+        else:
+            self.resolved += 1
+        return filepath
+
+    # Like resolve, without counting the lookup
+    def find(self, texture):
+        key = normalize_texture_name(texture)
+        filepath = self.files.get(key)
+        if(filepath is None):
+            filepath = self.file_names.get(key.rsplit("/", 1)[-1])
+        return filepath
+
+    # Reads the files of textures ahead of their use, so they're already in the OS file cache once Blender loads them.
+    # Meant to be called from a background thread while the main thread is busy, every file is only read once
+    def prefetch(self, textures):
+        for texture in textures:
+            filepath = self.find(texture)
+            if(filepath is None or filepath in self.prefetched):
+                continue
+            self.prefetched.add(filepath)
+            try:
+                with open(filepath, "rb") as f:
+                    block = f.read(PREFETCH_BLOCK_SIZE)
+                    while len(block) > 0:
+                        self.prefetched_bytes += len(block)
+                        block = f.read(PREFETCH_BLOCK_SIZE)
+            except OSError:
+                pass
+
+    def report(self):
+        print("Texture resolver: " + str(len(self.files)) + " files indexed with " + str(self.stat_calls) + " stat calls, " + str(self.resolved) + " lookups resolved, " + str(len(self.missing)) + " textures missing")
+        if(len(self.prefetched) > 0):
+            print("Prefetched " + str(len(self.prefetched)) + " texture files (" + str(self.prefetched_bytes) + " bytes)")
+
+def normalize_texture_name(texture):
+    return posixpath.normpath(texture.replace("\\", "/").lower()).lstrip("/")
+
+# Finds the texture folder that belongs to a locale or skin file, matching its name case insensitively.
+# Returns a resolver without any files when there's no texture folder
+def get_texture_resolver(filepath):
+    parent = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(filepath)), os.path.pardir, os.path.pardir))
+    texture_folder = None
+    try:
+        for entry in os.scandir(parent):
+            if(entry.name.lower() == TEXTURE_FOLDER_NAME and entry.is_dir()):
+                texture_folder = entry.path
+                break
+    except OSError:
+        pass
+    resolver = TextureResolver(texture_folder)
+    # The scan of the parent folder
+    resolver.stat_calls += 1
+    return resolver